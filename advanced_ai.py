@@ -4,6 +4,7 @@ Includes: Web Search, Storytelling, Polls, News, Weather, Brainstorming
 """
 
 import random
+import time
 import asyncio
 import aiohttp
 import json
@@ -21,7 +22,31 @@ class AdvancedAI:
         self.last_story = {}
         self.last_poll = {}
         self.stories_told = []
+        self._fetches = {}  # kind -> (time bucket, shared fetch task)
         
+    async def _cached_fetch(self, kind: str, ttl: int, fetch) -> Optional[str]:
+        """Run fetch() at most once per ttl-second bucket, sharing the result (None = failed)"""
+        bucket = int(time.time() // ttl)
+        cached = self._fetches.get(kind)
+        
+        # Concurrent callers (e.g. a broadcast to every group) await the same task
+        if cached is None or cached[0] != bucket:
+            task = asyncio.ensure_future(fetch())
+            cached = (bucket, task)
+            self._fetches[kind] = cached
+            task.add_done_callback(lambda t: self._evict_failed_fetch(kind, t))
+        
+        # Shielded so a cancelled caller doesn't cancel the fetch for everyone
+        return await asyncio.shield(cached[1])
+    
+    def _evict_failed_fetch(self, kind: str, task) -> None:
+        """Drop a cancelled or failed fetch so the next caller retries"""
+        cached = self._fetches.get(kind)
+        if cached is None or cached[1] is not task:
+            return
+        if task.cancelled() or task.exception() is not None or task.result() is None:
+            del self._fetches[kind]
+    
     async def search_web(self, query: str) -> Optional[Dict]:
         """Search the web for real-time information"""
         try:
@@ -38,7 +63,14 @@ class AdvancedAI:
             return None
     
     async def get_namibia_weather(self) -> str:
-        """Get current weather information for Namibia"""
+        """Get current weather information for Namibia (refreshed every 10 minutes)"""
+        weather = await self._cached_fetch("weather", 600, self._fetch_namibia_weather)
+        if weather is None:
+            return "🌤️ *Namibia Weather*\n\nGenerally sunny with warm temperatures. Perfect safari weather! ☀️"
+        return weather
+    
+    async def _fetch_namibia_weather(self) -> Optional[str]:
+        """Fetch current weather information for Namibia (None if no city could be fetched)"""
         # Try multiple weather sources
         cities = ["Windhoek", "Swakopmund", "Walvis Bay"]
         weather_info = []
@@ -73,11 +105,17 @@ class AdvancedAI:
             response += "\n".join(weather_info)
             response += "\n\n_Live weather data of Namibia_"
             return response
-        else:
-            return "🌤️ *Namibia Weather*\n\nGenerally sunny with warm temperatures. Perfect safari weather! ☀️"
+        return None
     
     async def get_namibia_news(self) -> str:
-        """Get latest Namibia news"""
+        """Get latest Namibia news (refreshed hourly)"""
+        news = await self._cached_fetch("news", 3600, self._fetch_namibia_news)
+        if news is None:
+            return self._get_fallback_news()
+        return news
+    
+    async def _fetch_namibia_news(self) -> Optional[str]:
+        """Fetch latest Namibia news (None if no live news was found)"""
         try:
             # Search for Namibia news
             query = "Namibia+news+latest"
@@ -95,11 +133,10 @@ class AdvancedAI:
                     response += "\n\n_Updates from web search_"
                     return response
             
-            # Fallback to curated news topics
-            return self._get_fallback_news()
+            return None
         except Exception as e:
             logger.error(f"News fetch error: {e}")
-            return self._get_fallback_news()
+            return None
     
     def _get_fallback_news(self) -> str:
         """Fallback news topics when web search fails"""
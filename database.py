@@ -1,76 +1,109 @@
 import os
-import sqlite3
+import asyncio
+import time
+import aiosqlite
 from datetime import datetime
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
 
 class Database:
     def __init__(self):
         self.db_path = os.getenv('DATABASE_PATH', 'bot_data.db')
-        self.init_database()
-    
-    @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
-    
-    def init_database(self):
-        """Initialize all database tables"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    joined_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Query logs table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS query_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    query TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(user_id)
-                )
-            ''')
-            
-            # Chats table for tracking group chats
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS chats (
-                    chat_id INTEGER PRIMARY KEY,
-                    chat_type TEXT,
-                    chat_title TEXT,
-                    joined_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_active INTEGER DEFAULT 1
-                )
-            ''')
+        # One connection for the bot's lifetime, opened on first use; queries
+        # run on aiosqlite's worker thread so the event loop never blocks
+        self._conn = None
+        self._lock = asyncio.Lock()
+        # Active chats change rarely but are read by every broadcast job
+        self._active_chats = None
+        self._active_chats_expires = 0
+        self._active_chat_ids = frozenset()
+    
+    @asynccontextmanager
+    async def get_connection(self):
+        """Context manager for a transaction on the shared connection"""
+        async with self._lock:
+            if self._conn is None:
+                conn = await aiosqlite.connect(self.db_path)
+                conn.row_factory = aiosqlite.Row
+                # WAL lets every handler write commit without a full fsync;
+                # NORMAL sync still survives an application crash
+                await conn.execute('PRAGMA journal_mode=WAL')
+                await conn.execute('PRAGMA synchronous=NORMAL')
+                await conn.execute('PRAGMA temp_store=MEMORY')
+                await self.init_database(conn)
+                self._conn = conn
             
-            # Create indexes
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_id ON query_logs(user_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON query_logs(timestamp)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_active ON chats(is_active)')
+            try:
+                yield self._conn
+                await self._conn.commit()
+            except Exception as e:
+                await self._conn.rollback()
+                raise e
+    
+    async def close(self):
+        """Close the shared connection"""
+        async with self._lock:
+            if self._conn is not None:
+                await self._conn.close()
+                self._conn = None
+    
+    async def init_database(self, conn):
+        """Initialize all database tables"""
+        cursor = await conn.cursor()
+        
+        # Users table
+        await cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                first_name TEXT,
+                joined_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Query logs table
+        await cursor.execute('''
+            CREATE TABLE IF NOT EXISTS query_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                query TEXT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+            )
+        ''')
+        
+        # Chats table for tracking group chats
+        await cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chats (
+                chat_id INTEGER PRIMARY KEY,
+                chat_type TEXT,
+                chat_title TEXT,
+                joined_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_active INTEGER DEFAULT 1
+            )
+        ''')
+        
+        # Per-chat bot state (activity/greeting timestamps) kept across restarts
+        await cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bot_state (
+                kind TEXT,
+                key TEXT,
+                updated REAL,
+                PRIMARY KEY (kind, key)
+            )
+        ''')
+        
+        # Create indexes
+        await cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_id ON query_logs(user_id)')
+        await cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON query_logs(timestamp)')
+        await cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_active ON chats(is_active)')
     
-    def add_user(self, user_id, username, first_name=None):
+    async def add_user(self, user_id, username, first_name=None):
         """Add or update user"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('''
                 INSERT INTO users (user_id, username, first_name, last_active)
                 VALUES (?, ?, ?, CURRENT_TIMESTAMP)
                 ON CONFLICT(user_id) DO UPDATE SET
@@ -79,11 +112,11 @@ class Database:
                     last_active = CURRENT_TIMESTAMP
             ''', (user_id, username, first_name))
     
-    def track_chat(self, chat_id, chat_type='group', chat_title=None):
+    async def track_chat(self, chat_id, chat_type='group', chat_title=None):
         """Track a group chat for automated postings"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('''
                 INSERT INTO chats (chat_id, chat_type, chat_title, last_active)
                 VALUES (?, ?, ?, CURRENT_TIMESTAMP)
                 ON CONFLICT(chat_id) DO UPDATE SET
@@ -92,58 +125,146 @@ class Database:
                     last_active = CURRENT_TIMESTAMP,
                     is_active = 1
             ''', (chat_id, chat_type, chat_title))
+        
+        # A new or reactivated chat changes the active list
+        if chat_id not in self._active_chat_ids:
+            self.invalidate_active_chats()
     
-    def get_active_chats(self):
-        """Get all active group chats for automated postings"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+    async def log_message(self, user_id, username, first_name=None,
+                          chat_id=None, chat_type=None, chat_title=None, query=None):
+        """Record an incoming message - user, chat and query - in one transaction"""
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('''
+                INSERT INTO users (user_id, username, first_name, last_active)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    username = excluded.username,
+                    first_name = excluded.first_name,
+                    last_active = CURRENT_TIMESTAMP
+            ''', (user_id, username, first_name))
+            
+            if chat_id is not None:
+                await cursor.execute('''
+                    INSERT INTO chats (chat_id, chat_type, chat_title, last_active)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(chat_id) DO UPDATE SET
+                        chat_type = excluded.chat_type,
+                        chat_title = excluded.chat_title,
+                        last_active = CURRENT_TIMESTAMP,
+                        is_active = 1
+                ''', (chat_id, chat_type, chat_title))
+            
+            if query is not None:
+                await cursor.execute('''
+                    INSERT INTO query_logs (user_id, query)
+                    VALUES (?, ?)
+                ''', (user_id, query))
+        
+        if chat_id is not None and chat_id not in self._active_chat_ids:
+            self.invalidate_active_chats()
+    
+    async def get_active_chats(self, ttl=60):
+        """Get all active group chats for automated postings (cached for ttl seconds)"""
+        if self._active_chats is not None and time.monotonic() < self._active_chats_expires:
+            return self._active_chats
+        
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('''
                 SELECT chat_id, chat_type, chat_title
                 FROM chats
                 WHERE is_active = 1
                 ORDER BY last_active DESC
             ''')
-            return [dict(row) for row in cursor.fetchall()]
+            chats = [dict(row) for row in await cursor.fetchall()]
+        
+        self._active_chats = chats
+        self._active_chat_ids = frozenset(chat['chat_id'] for chat in chats)
+        self._active_chats_expires = time.monotonic() + ttl
+        return chats
     
-    def deactivate_chat(self, chat_id):
+    async def count_active_chats(self):
+        """Get the number of active chats"""
+        if self._active_chats is not None and time.monotonic() < self._active_chats_expires:
+            return len(self._active_chats)
+        
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('SELECT COUNT(*) as count FROM chats WHERE is_active = 1')
+            return (await cursor.fetchone())['count']
+    
+    def invalidate_active_chats(self):
+        """Force the next get_active_chats call to re-read the database"""
+        self._active_chats = None
+        self._active_chat_ids = frozenset()
+    
+    async def deactivate_chat(self, chat_id):
         """Deactivate a chat (e.g., when bot is removed)"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('''
                 UPDATE chats
                 SET is_active = 0
                 WHERE chat_id = ?
             ''', (chat_id,))
+        self.invalidate_active_chats()
+    
+    async def save_bot_state(self, rows, expire_before=None):
+        """Upsert (kind, key, updated) state rows in one transaction"""
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.executemany('''
+                INSERT INTO bot_state (kind, key, updated)
+                VALUES (?, ?, ?)
+                ON CONFLICT(kind, key) DO UPDATE SET
+                    updated = excluded.updated
+            ''', rows)
+            
+            # Drop entries too old to matter after a restart
+            if expire_before is not None:
+                await cursor.execute('DELETE FROM bot_state WHERE updated < ?', (expire_before,))
+    
+    async def load_bot_state(self, kind, since):
+        """Get {key: updated} for state of one kind updated after 'since'"""
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('''
+                SELECT key, updated
+                FROM bot_state
+                WHERE kind = ? AND updated >= ?
+            ''', (kind, since))
+            return {row['key']: row['updated'] for row in await cursor.fetchall()}
     
-    def log_query(self, user_id, query):
+    async def log_query(self, user_id, query):
         """Log a user query"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('''
                 INSERT INTO query_logs (user_id, query)
                 VALUES (?, ?)
             ''', (user_id, query))
     
-    def get_user_stats(self, user_id):
+    async def get_user_stats(self, user_id):
         """Get user statistics"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
             
             # Get user info
-            cursor.execute('''
+            await cursor.execute('''
                 SELECT username, joined_date
                 FROM users
                 WHERE user_id = ?
             ''', (user_id,))
-            user_info = cursor.fetchone()
+            user_info = await cursor.fetchone()
             
             # Get query count
-            cursor.execute('''
+            await cursor.execute('''
                 SELECT COUNT(*) as count
                 FROM query_logs
                 WHERE user_id = ?
             ''', (user_id,))
-            query_count = cursor.fetchone()['count']
+            query_count = (await cursor.fetchone())['count']
             
             return {
                 'username': user_info['username'] if user_info else 'Unknown',
@@ -151,29 +272,36 @@ class Database:
                 'query_count': query_count
             }
     
-    def get_all_users(self):
+    async def get_all_users(self):
         """Get all users"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM users ORDER BY joined_date DESC')
-            return [dict(row) for row in cursor.fetchall()]
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('SELECT * FROM users ORDER BY joined_date DESC')
+            return [dict(row) for row in await cursor.fetchall()]
+    
+    async def count_users(self):
+        """Get total number of users"""
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('SELECT COUNT(*) as count FROM users')
+            return (await cursor.fetchone())['count']
     
-    def get_popular_queries(self, limit=10):
+    async def get_popular_queries(self, limit=10):
         """Get most popular queries"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('''
                 SELECT query, COUNT(*) as count
                 FROM query_logs
                 GROUP BY query
                 ORDER BY count DESC
                 LIMIT ?
             ''', (limit,))
-            return [dict(row) for row in cursor.fetchall()]
+            return [dict(row) for row in await cursor.fetchall()]
     
-    def get_total_queries(self):
+    async def get_total_queries(self):
         """Get total number of queries"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) as count FROM query_logs')
-            return cursor.fetchone()['count']
+        async with self.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute('SELECT COUNT(*) as count FROM query_logs')
+            return (await cursor.fetchone())['count']
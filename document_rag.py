@@ -10,6 +10,8 @@ import logging
 import asyncio
 import aiohttp
 import hashlib
+from concurrent.futures import Executor
+import heapq
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 import json
@@ -36,6 +38,7 @@ class DocumentRAG:
         self.document_chunks = []  # Chunks for better retrieval
         self.last_sync = None
         self.sync_interval = timedelta(hours=1)  # Re-sync every hour
+        self.version = 0  # Bumped each time a synced index is swapped in
         
         # Cache directory
         self.cache_dir = "/tmp/rag_cache"
@@ -62,6 +65,11 @@ class DocumentRAG:
                         logger.error("❌ Invalid response from GitHub API")
                         return False
                     
+                    # Build the new index aside so searches keep using the
+                    # current one until the sync is complete
+                    documents = list(self.documents)
+                    document_chunks = list(self.document_chunks)
+                    
                     # Process each file
                     new_docs = 0
                     updated_docs = 0
@@ -80,17 +88,42 @@ class DocumentRAG:
                         if not self._is_supported_file(file_name):
                             continue
                         
+                        # Skip documents that haven't changed since last sync
+                        file_sha = file_info.get('sha')
+                        if file_sha and any(
+                            doc['filename'] == file_name and doc.get('sha') == file_sha
+                            for doc in documents
+                        ):
+                            continue
+                        
                         # Download and process document
-                        success = await self._download_and_process(
+                        processed = await self._download_and_process(
                             session, file_name, download_url
                         )
                         
-                        if success:
+                        if processed:
+                            document, chunks = processed
+                            document['sha'] = file_sha
+                            
                             # Check if new or updated
                             if self._is_new_document(file_name):
                                 new_docs += 1
                             else:
                                 updated_docs += 1
+                            
+                            # Replace old version and its chunks if exists
+                            documents = [d for d in documents if d['filename'] != file_name]
+                            documents.append(document)
+                            document_chunks = [
+                                c for c in document_chunks
+                                if c['filename'] != file_name
+                            ]
+                            document_chunks.extend(chunks)
+                    
+                    # Swap in the new index in one step
+                    self.documents = documents
+                    self.document_chunks = document_chunks
+                    self.version += 1
                     
                     self.last_sync = datetime.now()
                     logger.info(f"✅ Document sync complete: {new_docs} new, {updated_docs} updated")
@@ -112,14 +145,15 @@ class DocumentRAG:
         """Check if document is new (not in current collection)"""
         return not any(doc['filename'] == filename for doc in self.documents)
     
-    async def _download_and_process(self, session, filename: str, url: str) -> bool:
-        """Download and process a document"""
+    async def _download_and_process(self, session, filename: str,
+                                    url: str) -> Optional[Tuple[Dict, List[Dict]]]:
+        """Download and process a document - Returns (document, chunks)"""
         try:
             # Download file
             async with session.get(url, timeout=60) as response:
                 if response.status != 200:
                     logger.warning(f"⚠️ Failed to download {filename}: {response.status}")
-                    return False
+                    return None
                 
                 content = await response.read()
                 
@@ -133,7 +167,7 @@ class DocumentRAG:
                 
                 if not text_content:
                     logger.warning(f"⚠️ No text extracted from {filename}")
-                    return False
+                    return None
                 
                 # Create document metadata
                 doc_hash = hashlib.md5(content).hexdigest()
@@ -148,31 +182,16 @@ class DocumentRAG:
                     'char_count': len(text_content)
                 }
                 
-                # Remove old version if exists
-                self.documents = [d for d in self.documents if d['filename'] != filename]
-                
-                # Add new document
-                self.documents.append(document)
-                
                 # Create searchable chunks
                 chunks = self._create_chunks(text_content, filename)
                 
-                # Remove old chunks for this document
-                self.document_chunks = [
-                    c for c in self.document_chunks 
-                    if c['filename'] != filename
-                ]
-                
-                # Add new chunks
-                self.document_chunks.extend(chunks)
-                
                 logger.info(f"✅ Processed {filename}: {len(chunks)} chunks, {document['word_count']} words")
                 
-                return True
+                return document, chunks
         
         except Exception as e:
             logger.error(f"❌ Error processing {filename}: {e}")
-            return False
+            return None
     
     async def _extract_text(self, file_path: str, filename: str) -> str:
         """Extract text from various file formats"""
@@ -500,9 +519,52 @@ class DocumentRAG:
         Returns:
             List of relevant chunks with metadata
         """
+        return self._batch_search([query], limit)[0]
+    
+    def _batch_search(self, queries: List[str], limit: int = 2) -> List[List[Dict]]:
+        """
+        Search documents for several queries in a single pass over the chunks
+        
+        Each chunk is lowercased and split once and then scored against every
+        query, so a burst of queries shares the per-chunk preparation cost.
+        
+        Args:
+            queries: Search queries
+            limit: Maximum results per query
+        
+        Returns:
+            One result list per query, in the same order as queries
+        """
         if not self.document_chunks:
-            return []
+            return [[] for _ in queries]
+        
+        prepared = [self._prepare_query(query) for query in queries]
+        scored = [[] for _ in queries]
+        
+        if any(query_words for _, query_words in prepared):
+            for chunk in self.document_chunks:
+                chunk_text_lower = chunk['text'].lower()
+                chunk_words = chunk_text_lower.split()
+                
+                for i, (query_lower, query_words) in enumerate(prepared):
+                    if not query_words:
+                        continue
+                    
+                    score, _ = self._score_chunk(
+                        chunk, chunk_text_lower, chunk_words, query_lower, query_words
+                    )
+                    
+                    # Plain (score, chunk) pairs - only the top few are ever used
+                    if score > 0:
+                        scored[i].append((score, chunk))
         
+        return [
+            self._build_results(scored_chunks, query, limit)
+            for query, scored_chunks in zip(queries, scored)
+        ]
+    
+    def _prepare_query(self, query: str) -> Tuple[str, List[str]]:
+        """Lowercase query and extract its meaningful words"""
         query_lower = query.lower().strip()
         
         # Extract meaningful words from query
@@ -520,76 +582,68 @@ class DocumentRAG:
         }
         query_words = [w for w in query_words if w not in stop_words]
         
-        if not query_words:
-            return []
-        
-        scored_chunks = []
+        return query_lower, query_words
+    
+    def _score_chunk(self, chunk: Dict, chunk_text_lower: str, chunk_words: List[str],
+                     query_lower: str, query_words: List[str]) -> Tuple[int, int]:
+        """Score one chunk against one prepared query - Returns (score, matching_words)"""
+        score = 0
+        
+        # 1. Exact phrase match (highest priority)
+        if query_lower in chunk_text_lower:
+            score += 1000
+        
+        # 2. All query words appear
+        all_words_match = all(word in chunk_text_lower for word in query_words)
+        if all_words_match and query_words:
+            score += 500
+        
+        # 3. Most query words appear
+        matching_words = sum(1 for word in query_words if word in chunk_text_lower)
+        if matching_words > 0:
+            score += matching_words * 100
+            percentage_match = matching_words / len(query_words)
+            score += int(percentage_match * 200)
+        
+        # 4. Proximity bonus - words appear close together
+        for i in range(len(chunk_words) - len(query_words) + 1):
+            window = chunk_words[i:i + len(query_words)]
+            window_matches = sum(1 for word in query_words if word in window)
+            if window_matches == len(query_words):
+                score += 300
+                break
         
-        for chunk in self.document_chunks:
-            score = 0
-            chunk_text_lower = chunk['text'].lower()
-            
-            # 1. Exact phrase match (highest priority)
-            if query_lower in chunk_text_lower:
-                score += 1000
-            
-            # 2. All query words appear
-            all_words_match = all(word in chunk_text_lower for word in query_words)
-            if all_words_match and query_words:
-                score += 500
-            
-            # 3. Most query words appear
-            matching_words = sum(1 for word in query_words if word in chunk_text_lower)
-            if matching_words > 0:
-                score += matching_words * 100
-                percentage_match = matching_words / len(query_words)
-                score += int(percentage_match * 200)
-            
-            # 4. Proximity bonus - words appear close together
-            chunk_words = chunk_text_lower.split()
-            for i in range(len(chunk_words) - len(query_words) + 1):
-                window = chunk_words[i:i + len(query_words)]
-                window_matches = sum(1 for word in query_words if word in window)
-                if window_matches == len(query_words):
-                    score += 300
-                    break
-            
-            # 5. Prefer summary chunks for overview
-            if chunk.get('is_summary'):
-                score += 150
-            
-            # 6. Prefer shorter, more concise chunks
-            word_count = len(chunk_text_lower.split())
-            if word_count < 100:
+        # 5. Prefer summary chunks for overview
+        if chunk.get('is_summary'):
+            score += 150
+        
+        # 6. Prefer shorter, more concise chunks
+        word_count = len(chunk_words)
+        if word_count < 100:
+            score += 50
+        elif word_count > 300:
+            score -= 30
+        
+        # 7. Question word matching
+        question_words = ['who', 'what', 'where', 'when', 'why', 'how', 'which']
+        for q_word in question_words:
+            if q_word in query_lower and q_word in chunk_text_lower:
                 score += 50
-            elif word_count > 300:
-                score -= 30
-            
-            # 7. Question word matching
-            question_words = ['who', 'what', 'where', 'when', 'why', 'how', 'which']
-            for q_word in question_words:
-                if q_word in query_lower and q_word in chunk_text_lower:
-                    score += 50
-            
-            # 8. Remove headings penalty (avoid "WELCOME TO" headings)
-            if chunk_text_lower.startswith('welcome to') or chunk_text_lower.isupper():
-                score -= 100
-            
-            if score > 0:
-                scored_chunks.append({
-                    'chunk': chunk,
-                    'score': score,
-                    'matching_words': matching_words
-                })
         
-        # Sort by score
-        scored_chunks.sort(key=lambda x: x['score'], reverse=True)
+        # 8. Remove headings penalty (avoid "WELCOME TO" headings)
+        if chunk_text_lower.startswith('welcome to') or chunk_text_lower.isupper():
+            score -= 100
+        
+        return score, matching_words
+    
+    def _build_results(self, scored_chunks: List[Tuple[int, Dict]], query: str, limit: int) -> List[Dict]:
+        """Summarize the top scored chunks into search results"""
+        # Select the top results without sorting every scored chunk
+        top_chunks = heapq.nlargest(limit, scored_chunks, key=lambda x: x[0])
         
-        # Get top results and summarize
+        # Summarize only the selected chunks
         results = []
-        for item in scored_chunks[:limit]:
-            chunk = item['chunk']
-            
+        for score, chunk in top_chunks:
             # Summarize chunk based on query
             summarized_text = self._summarize_chunk(chunk['text'], query)
             
@@ -615,7 +669,7 @@ class DocumentRAG:
             results.append({
                 'text': summarized_text,
                 'filename': chunk['filename'],
-                'score': item['score'],
+                'score': score,
                 'source': 'document',
                 'type': 'document_chunk',
                 'is_summary': chunk.get('is_summary', False),
@@ -653,8 +707,10 @@ class DocumentRAG:
             for doc in self.documents
         ]
     
-    async def auto_sync(self):
-        """Auto-sync documents periodically"""
+    async def auto_sync(self, initial_delay: float = 0):
+        """Auto-sync documents periodically (first check after initial_delay seconds)"""
+        await asyncio.sleep(initial_delay)
+        
         while True:
             try:
                 # Check if sync needed
@@ -681,6 +737,112 @@ class DocumentRAG:
             'total_documents': len(self.documents),
             'total_chunks': len(self.document_chunks),
             'last_sync': self.last_sync.isoformat() if self.last_sync else 'Never',
+            'version': self.version,
             'cache_dir': self.cache_dir,
             'source_url': self.github_repo_url
         }
+
+
+class RAGQueryProcessor:
+    """Micro-batches concurrent document searches into single RAG passes"""
+    
+    def __init__(self, rag: DocumentRAG, batch_size: int = 16, max_wait_ms: int = 50,
+                 executor: Optional[Executor] = None):
+        """
+        Initialize query processor
+        
+        Args:
+            rag: DocumentRAG instance to search
+            batch_size: Dispatch as soon as this many queries are pending
+            max_wait_ms: Longest time a burst of queries waits for the batch to fill
+            executor: Thread pool to score batches on (default: the loop's executor)
+        """
+        self.rag = rag
+        self.executor = executor
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+    
+    async def submit(self, query: str, limit: int = 2) -> List[Dict]:
+        """Queue a search and wait for its batch to be processed"""
+        if self._worker is None or self._worker.done():
+            # Queries left behind by a stopped worker would never be answered
+            self._fail_pending()
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, limit, future))
+        return await future
+    
+    async def close(self):
+        """Stop the batching worker"""
+        worker, self._worker = self._worker, None
+        if worker is not None and not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending()
+    
+    def _fail_pending(self, batch=()):
+        """Cancel queued (and in-flight) queries so their callers don't wait forever"""
+        pending = list(batch)
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+        
+        for _, _, future in pending:
+            if not future.done():
+                future.cancel()
+    
+    async def _run(self):
+        """Collect pending queries and dispatch them as batches"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                
+                # Let queries submitted in the same tick get queued, then take them
+                await asyncio.sleep(0)
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                
+                # A lone query goes out at once; only a burst waits for the
+                # rest of the window to fill the batch
+                if len(batch) > 1:
+                    deadline = loop.time() + self.max_wait
+                    
+                    while len(batch) < self.batch_size:
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                        except asyncio.TimeoutError:
+                            break
+                
+                queries = [query for query, _, _ in batch]
+                limit = max(item_limit for _, item_limit, _ in batch)
+                
+                try:
+                    results = await loop.run_in_executor(
+                        self.executor, self.rag._batch_search, queries, limit
+                    )
+                except Exception as e:
+                    logger.error(f"❌ Batch search error: {e}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                
+                for (_, item_limit, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result[:item_limit])
+        except asyncio.CancelledError:
+            self._fail_pending(batch)
+            raise
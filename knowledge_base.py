@@ -1,21 +1,39 @@
 import os
 import sqlite3
-import re
 import requests
 import csv
 import time
 import io
+import heapq
+import threading
 from contextlib import contextmanager
+from dataclasses import dataclass
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Punctuation stripped from search queries
+_PUNCT_TABLE = str.maketrans({c: ' ' for c in '?!.,;:'})
+
+@dataclass(slots=True, frozen=True)
+class Topic:
+    """A knowledge base entry, as returned by the browse helpers"""
+    category: str
+    topic: str
+    content: str
+    keywords: str
+
 class KnowledgeBase:
     def __init__(self):
         self.db_path = os.getenv('DATABASE_PATH', 'bot_data.db')
         self.csv_url = 'https://gist.githubusercontent.com/nambili-samuel/a3bf79d67b2bd0c8d5aa9a830024417d/raw/334e9fdd50efdcedc849019fbf73afb8a82f8a92/namibia_knowledge_base.csv2'
         self.last_sync = 0
         self.sync_interval = 10 * 60 * 1000  # 10 minutes in milliseconds
+        self.version = 0  # Bumped on every write so callers can invalidate caches
+        self._index = None  # (by_category, categories, topics) for _index_version
+        self._index_version = None
+        # Searches run on a thread pool; only one thread syncs the CSV at a time
+        self._sync_lock = threading.RLock()
         
         self.init_knowledge_base()
         self.seed_namibia_data()
@@ -161,6 +179,11 @@ class KnowledgeBase:
     
     def sync_with_csv(self):
         """Sync database with CSV file from GitHub Gist"""
+        with self._sync_lock:
+            return self._sync_with_csv()
+    
+    def _sync_with_csv(self):
+        """Sync database with CSV file (caller holds _sync_lock)"""
         try:
             current_time = time.time() * 1000
             
@@ -277,13 +300,16 @@ class KnowledgeBase:
                     try:
                         # Check if entry exists
                         cursor.execute('''
-                            SELECT id FROM knowledge 
+                            SELECT id, content, keywords FROM knowledge 
                             WHERE topic = ? AND category = ?
                         ''', (entry['topic'], entry['category']))
                         
                         existing = cursor.fetchone()
                         
-                        if existing:
+                        if existing and (existing['content'], existing['keywords']) == (entry['content'], entry['keywords']):
+                            # Unchanged - leave the row (and cached views of it) alone
+                            continue
+                        elif existing:
                             # Update existing entry
                             cursor.execute('''
                                 UPDATE knowledge 
@@ -328,6 +354,9 @@ class KnowledgeBase:
                 
                 logger.info(f"✅ CSV sync complete: {added} added, {updated} updated")
             
+            if added or updated:
+                self.version += 1
+            
             self.last_sync = current_time
             return True
             
@@ -359,13 +388,17 @@ class KnowledgeBase:
         # Ensure we have data and auto-sync if needed
         self.ensure_data()
         
-        try:
-            # Try to sync in background (non-blocking)
-            current_time = time.time() * 1000
-            if (current_time - self.last_sync) >= self.sync_interval:
-                self.sync_with_csv()
-        except:
-            pass  # Don't block search if sync fails
+        # Refresh when due, unless another search is already doing it -
+        # concurrent searches keep serving the current data meanwhile
+        if self._sync_lock.acquire(blocking=False):
+            try:
+                current_time = time.time() * 1000
+                if (current_time - self.last_sync) >= self.sync_interval:
+                    self._sync_with_csv()
+            except:
+                pass  # Don't block search if sync fails
+            finally:
+                self._sync_lock.release()
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -374,7 +407,7 @@ class KnowledgeBase:
             clean_query = query.lower().strip()
             
             # Remove question marks and punctuation
-            clean_query = re.sub(r'[?!.,;:]+', ' ', clean_query)
+            clean_query = clean_query.translate(_PUNCT_TABLE)
             
             # Remove common question words that don't help search
             question_words = ['what', 'where', 'when', 'who', 'why', 'how', 'is', 'are', 
@@ -473,12 +506,12 @@ class KnowledgeBase:
                     row_dict['_score'] = score
                     unique_results.append(row_dict)
             
-            # Sort by score descending
-            unique_results.sort(key=lambda x: x.get('_score', 0), reverse=True)
+            # Select top results by score without sorting the full list
+            top_results = heapq.nlargest(limit, unique_results, key=lambda x: x.get('_score', 0))
             
             # Remove score field and return top results
             final_results = []
-            for r in unique_results[:limit]:
+            for r in top_results:
                 r.pop('_score', None)
                 r.pop('priority', None)
                 final_results.append(r)
@@ -501,35 +534,56 @@ class KnowledgeBase:
                 INSERT OR REPLACE INTO knowledge_fts (rowid, category, topic, content, keywords)
                 VALUES (?, ?, ?, ?, ?)
             ''', (knowledge_id, category, topic, content, keywords))
-    
-    def get_all_topics(self):
-        """Get all available topics"""
-        self.ensure_data()
         
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT DISTINCT topic FROM knowledge ORDER BY topic')
-            return [row['topic'] for row in cursor.fetchall()]
+        self.version += 1
     
-    def get_by_category(self, category):
-        """Get all topics in a category"""
+    def _get_index(self):
+        """Get the in-memory category index, rebuilt after any knowledge write"""
+        if self._index is not None and self._index_version == self.version:
+            return self._index
+        
         self.ensure_data()
+        version = self.version
         
+        # One query loads everything the browse/list helpers need
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT topic, content, keywords
+                SELECT category, topic, content, keywords
                 FROM knowledge
-                WHERE category = ?
                 ORDER BY topic
-            ''', (category,))
-            return [dict(row) for row in cursor.fetchall()]
+            ''')
+            rows = cursor.fetchall()
+        
+        by_category = {}
+        for row in rows:
+            by_category.setdefault(row['category'], []).append(Topic(
+                row['category'],
+                row['topic'],
+                row['content'],
+                row['keywords'] or ''
+            ))
+        
+        index = (
+            {category: tuple(topics) for category, topics in by_category.items()},
+            tuple(sorted(by_category)),
+            tuple(sorted({row['topic'] for row in rows}))
+        )
+        
+        # Don't pin an empty index - the next call should retry the sync
+        if rows:
+            self._index = index
+            self._index_version = version
+        return index
+    
+    def get_all_topics(self):
+        """Get all available topics"""
+        return self._get_index()[2]
+    
+    def get_by_category(self, category):
+        """Get all topics in a category"""
+        return self._get_index()[0].get(category, ())
     
     def get_categories(self):
-        """Get all categories"""
-        self.ensure_data()
-        
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT DISTINCT category FROM knowledge ORDER BY category')
-            return [row['category'] for row in cursor.fetchall()]
+        """Get all categories, sorted"""
+        return self._get_index()[1]
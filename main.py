@@ -3,25 +3,37 @@ import logging
 import random
 import re
 import asyncio
+import itertools
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time
+from functools import lru_cache
+from cachetools import TTLCache
+from aiolimiter import AsyncLimiter
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.error import TimedOut, NetworkError
+from telegram.request import HTTPXRequest
+from telegram.error import TimedOut, NetworkError, Forbidden, BadRequest, RetryAfter
 from telegram.ext import (
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
     ContextTypes,
     filters
 )
+try:
+    from telegram.ext import JobQueue
+    HAS_JOB_QUEUE = True
+except ImportError:
+    HAS_JOB_QUEUE = False
 from database import Database
 from knowledge_base import KnowledgeBase
 from health_server import run_health_server_background
 from smart_features import SmartFeatures
 from advanced_ai import AdvancedAI
 from conversational_intelligence import ConversationalIntelligence
-from document_rag import DocumentRAG
+from document_rag import DocumentRAG, RAGQueryProcessor
 
 # Configure logging
 logging.basicConfig(
@@ -41,6 +53,11 @@ if not TELEGRAM_BOT_TOKEN:
 ADMIN_IDS_STR = os.environ.get("ADMIN_IDS", "")
 ADMIN_IDS = set(map(int, ADMIN_IDS_STR.split(','))) if ADMIN_IDS_STR else set()
 
+# Optional chat the bot posts broadcasts to first; groups then get server-side
+# copies of that message instead of each receiving a fresh upload
+STAGING_CHAT_ID_STR = os.environ.get("STAGING_CHAT_ID", "")
+STAGING_CHAT_ID = int(STAGING_CHAT_ID_STR) if STAGING_CHAT_ID_STR else None
+
 # Webhook configuration - Auto-detect from Render
 RENDER_EXTERNAL_URL = os.environ.get("RENDER_EXTERNAL_URL")
 if RENDER_EXTERNAL_URL:
@@ -57,6 +74,125 @@ PORT = int(os.environ.get("PORT", "10000"))
 logger.info(f"🌐 Webhook will be: {WEBHOOK_URL}")
 logger.info(f"🔌 Port: {PORT}")
 
+# =========================================================
+# MESSAGE ANALYSIS
+# =========================================================
+_BOT_MENTIONS = ("@eva", "eva", "@namibiabot", "namibia bot", "hey bot", "hello bot", "hey eva")
+_QUESTION_STARTS = ("what", "how", "where", "when", "why", "who", "which",
+                    "can you", "tell me", "explain", "show me", "is", "are", "do", "does",
+                    "could you", "would you", "should", "will", "give me")
+_GREETINGS = frozenset({"hi", "hello", "hey", "moro", "greetings", "hallo", "howzit",
+                        "morning", "afternoon", "evening", "sup", "yo", "heya"})
+
+# Keyword triggers: (group, priority, keywords and phrases)
+# Keywords match at the start of a word, so inflections count too
+# ("tour" -> "tourism", "visit" -> "visiting", "invest" -> "investor")
+_KEYWORD_TRIGGERS = (
+    ("namibia", 90, ("namibia",)),
+    ("real_estate", 95, ("house", "propert", "land", "plot", "sale", "buy", "omuthiya",
+                         "okahandja", "bedroom", "rent", "invest", "price", "real estate",
+                         "windhoek west")),
+    ("topic", 90, ("etosha", "sossusvlei", "swakopmund", "windhoek", "himba", "herero",
+                   "desert", "dune", "cheetah", "elephant", "lion", "wildlife", "safari",
+                   "namib", "capital", "visa", "currency", "weather", "kalahari", "caprivi",
+                   "fish river", "skeleton coast", "walvis bay")),
+    ("travel", 85, ("travel", "tour", "visit", "trip", "vacation", "holiday", "destination",
+                    "booking", "accommodation")),
+    ("info", 85, ("info", "detail", "learn", "know", "interested", "curious", "wondering",
+                  "find out")),
+)
+
+def _alternation(words):
+    """Regex alternation for literal words, longest first so phrases win"""
+    return "|".join(map(re.escape, sorted(words, key=len, reverse=True)))
+
+# All keyword triggers in one compiled pattern - a single scan of the message
+# reports which trigger groups matched; mentions stay substring matches so
+# @username variants count
+_MENTION_RE = re.compile(_alternation(_BOT_MENTIONS))
+_KEYWORD_RE = re.compile(
+    r"\b(?:"
+    + "|".join(f"(?P<{group}>{_alternation(words)})" for group, _, words in _KEYWORD_TRIGGERS)
+    + r")\w*\b"
+)
+_MAX_GREETING_LEN = 200
+
+# Query cleaning - punctuation is mapped to spaces with str.translate, then
+# bot mentions and phrases that don't help search go in one regex pass
+_PUNCT_TABLE = str.maketrans({c: " " for c in "?!.,;:"})
+_CLEAN_RE = re.compile(
+    r"@\S*"
+    r"|(?:hey|hello|hi)\s+(?:eva|bot|namibia\s*bot)"
+    r"|tell me about|can you tell me|i want to know|could you|would you|please"
+    r"|what is|where is|who is|how is|when is"
+)
+_SPACES_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def _classify_message(msg):
+    """Score response triggers for a lowercased message - cached, as it depends only on the text"""
+    # 1. Direct mentions - 100% (substring match so @username variants count)
+    # Nothing outranks a 100% trigger, so skip the remaining scans
+    if _MENTION_RE.search(msg):
+        return (("search", 100),)
+    
+    # 2. Questions with ? - 100% (FIXED - was not responding)
+    if "?" in msg:
+        return (("search", 100),)
+    
+    # Split once for the greeting checks below
+    msg_words = msg.split()
+    first_two = msg_words[:2]
+    
+    response_types = []
+    
+    # 3. Questions without ? - 95%
+    if msg.startswith(_QUESTION_STARTS):
+        response_types.append(("search", 95))
+    
+    # 4. Greetings - 95% (IMPROVED - respond more often)
+    # Check if greeting is at start or is standalone; long messages aren't greetings
+    if len(msg) <= _MAX_GREETING_LEN:
+        if len(msg_words) <= 3 and not _GREETINGS.isdisjoint(msg_words):
+            # Short message with greeting = definitely a greeting
+            response_types.append(("greeting", 95))
+        elif not _GREETINGS.isdisjoint(first_two):
+            # Greeting in first 2 words
+            response_types.append(("greeting", 90))
+    
+    # 5-9. Namibia, real estate, topic, travel and info keywords (90/95/90/85/85%)
+    matched = {m.lastgroup for m in _KEYWORD_RE.finditer(msg)}
+    for group, priority, _ in _KEYWORD_TRIGGERS:
+        if group in matched:
+            response_types.append(("search", priority))
+    
+    return tuple(response_types)
+
+# Dedicated threads for blocking search work (KB queries, RAG chunk
+# scoring) so answering messages never waits behind other executor jobs
+_RESPONSE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="eva-search")
+
+# =========================================================
+# PER-CHAT STATE
+# =========================================================
+# Chat state is split into independent shards by chat key, so each
+# lookup touches one small cache and shards can later be owned by
+# separate workers
+_STATE_SHARDS = 16
+_STATE_TTLS = {
+    "activity": 86400,
+    "greeting": 7200,  # Expires with the greeting window
+}
+
+def _new_state_shard():
+    """Create one shard: a TTL cache per state kind plus its write-behind buffer"""
+    shard = {
+        kind: TTLCache(maxsize=50_000 // _STATE_SHARDS, ttl=ttl)
+        for kind, ttl in _STATE_TTLS.items()
+    }
+    shard["dirty"] = {}  # {(kind, key): wall-clock time} not yet saved
+    return shard
+
 # =========================================================
 # EVA GEISES - NAMIBIA BOT ENGINE WITH FULL GROUP MANAGEMENT
 # =========================================================
@@ -68,11 +204,18 @@ class EvaGeisesBot:
         self.ai = AdvancedAI()  # Advanced AI features
         self.ci = ConversationalIntelligence()  # Conversational intelligence
         self.rag = DocumentRAG()  # RAG document system
-        self.last_activity = {}
-        self.welcomed_users = set()
-        self.last_greeting = {}
+        self._processor = RAGQueryProcessor(self.rag, executor=_RESPONSE_POOL)  # Batches concurrent RAG searches
+        # Bounded per-chat/user state - entries expire instead of growing forever
+        self._shards = [_new_state_shard() for _ in range(_STATE_SHARDS)]
+        self.welcomed_users = TTLCache(maxsize=100_000, ttl=604800)
         self.last_property_post = {}
         self.property_rotation_index = 0
+        self._properties_cache = None
+        self._properties_cache_ts = 0
+        self._prop_cycle = None
+        self._sync_task = None
+        self._flush_task = None
+        self._rag_init_task = None
         logger.info(f"🇳🇦 Eva Geises initialized with {len(self.kb.get_all_topics())} topics")
         logger.info("🤖 Advanced AI features loaded")
         logger.info("🧠 Conversational intelligence enabled")
@@ -93,77 +236,23 @@ class EvaGeisesBot:
     def analyze_message(self, message, user_id, chat_id):
         """Analyze if Eva should respond - IMPROVED INTELLIGENCE"""
         msg = message.lower().strip()
-        self.last_activity[str(chat_id)] = datetime.now()
-        
-        response_types = []
-        
-        # 1. Direct mentions - 100%
-        bot_mentions = ["@eva", "eva", "@namibiabot", "namibia bot", "hey bot", "hello bot", "hey eva"]
-        if any(mention in msg for mention in bot_mentions):
-            response_types.append(("search", 100))
-        
-        # 2. Questions with ? - 100% (FIXED - was not responding)
-        if "?" in msg:
-            response_types.append(("search", 100))
-        
-        # 3. Questions without ? - 95%
-        question_words = ["what", "how", "where", "when", "why", "who", "which", 
-                         "can you", "tell me", "explain", "show me", "is", "are", "do", "does",
-                         "could you", "would you", "should", "will", "give me"]
-        if any(msg.startswith(w) for w in question_words):
-            response_types.append(("search", 95))
-        
-        # 4. Greetings - 95% (IMPROVED - respond more often)
-        greetings = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening", 
-                    "moro", "greetings", "hallo", "howzit", "morning", "afternoon", "evening",
-                    "sup", "yo", "heya"]
-        # Check if greeting is at start or is standalone
-        msg_words = msg.split()
-        if len(msg_words) <= 3 and any(g in msg_words for g in greetings):
-            # Short message with greeting = definitely a greeting
-            response_types.append(("greeting", 95))
-        elif any(g in msg_words[:2] for g in greetings):
-            # Greeting in first 2 words
-            response_types.append(("greeting", 90))
+        self._touch_state("activity", str(chat_id))
+        
+        # Single-character noise ("k", ".") can't trigger anything useful
+        if len(msg) < 2 and "?" not in msg:
+            return False, None
         
-        # 5. Namibia mentions - 90%
-        if "namibia" in msg or "namibian" in msg or "namibians" in msg:
-            response_types.append(("search", 90))
-        
-        # 6. Real estate keywords - 95%
-        real_estate_keywords = ["house", "property", "land", "plot", "sale", "buy", 
-                               "real estate", "windhoek west", "omuthiya", "okahandja",
-                               "bedroom", "bedroomed", "rent", "invest", "price"]
-        if any(keyword in msg for keyword in real_estate_keywords):
-            response_types.append(("search", 95))
-        
-        # 7. Specific topics - 90%
-        topics = ["etosha", "sossusvlei", "swakopmund", "windhoek", "himba", "herero", 
-                 "desert", "dunes", "fish river", "cheetah", "elephant", "lion", "wildlife",
-                 "safari", "namib", "capital", "visa", "currency", "weather", "kalahari",
-                 "skeleton coast", "caprivi", "walvis bay"]
-        if any(t in msg for t in topics):
-            response_types.append(("search", 90))
-        
-        # 8. Travel keywords - 85%
-        travel = ["travel", "tour", "visit", "trip", "vacation", "holiday", 
-                 "destination", "tourist", "booking", "accommodation"]
-        if any(w in msg for w in travel):
-            response_types.append(("search", 85))
-        
-        # 9. Informational requests - 85%
-        info_keywords = ["information", "info", "details", "learn", "know", "find out",
-                        "interested", "curious", "wondering"]
-        if any(k in msg for k in info_keywords):
-            response_types.append(("search", 85))
+        # 1-9. Keyword triggers (cached per message text)
+        response_types = list(_classify_message(msg))
+        if response_types and response_types[0][1] == 100:
+            return True, response_types[0][0]
         
         # 10. Quiet chat - 30%
         if self.is_chat_quiet(chat_id, minutes=20):
             response_types.append(("conversation_starter", 30))
         
         if response_types:
-            response_types.sort(key=lambda x: x[1], reverse=True)
-            top = response_types[0]
+            top = max(response_types, key=lambda x: x[1])
             # Always respond to high-priority triggers (80%+) - INCLUDES GREETINGS
             if top[1] >= 80 or random.random() < (top[1] / 100):
                 return True, top[0]
@@ -173,84 +262,173 @@ class EvaGeisesBot:
     def is_chat_quiet(self, chat_id, minutes=20):
         """Check if chat quiet"""
         chat_id_str = str(chat_id)
-        if chat_id_str not in self.last_activity:
+        last = self._shard(chat_id_str)["activity"].get(chat_id_str)
+        if last is None:
             return True
-        return datetime.now() - self.last_activity[chat_id_str] > timedelta(minutes=minutes)
+        return time.monotonic() - last > minutes * 60
     
     def should_send_greeting(self, chat_id):
         """Check if should send periodic greeting (every 2 hours)"""
         chat_id_str = str(chat_id)
-        now = datetime.now()
         
-        if chat_id_str not in self.last_greeting:
-            self.last_greeting[chat_id_str] = now
-            return True
+        # Entries expire after 2 hours; the age check also covers entries
+        # restored from the database, whose cache TTL restarted at load
+        last = self._shard(chat_id_str)["greeting"].get(chat_id_str)
+        if last is not None and time.monotonic() - last < _STATE_TTLS["greeting"]:
+            return False
+        
+        self._touch_state("greeting", chat_id_str)
+        return True
+    
+    def _shard(self, key):
+        """Get the state shard owning a chat key"""
+        return self._shards[hash(key) % _STATE_SHARDS]
+    
+    def _touch_state(self, kind, key):
+        """Record a state timestamp in memory and queue it for persistence"""
+        shard = self._shard(key)
+        shard[kind][key] = time.monotonic()
+        shard["dirty"][(kind, key)] = time.time()
+    
+    async def load_state(self):
+        """Restore chat state saved before the last restart"""
+        now_wall, now_mono = time.time(), time.monotonic()
+        for kind, ttl in _STATE_TTLS.items():
+            try:
+                saved = await self.db.load_bot_state(kind, since=now_wall - ttl)
+            except Exception as e:
+                logger.error(f"❌ Error loading {kind} state: {e}")
+                continue
+            
+            # Stored as wall-clock time; convert to this process's monotonic clock
+            for key, updated in saved.items():
+                self._shard(key)[kind][key] = now_mono - (now_wall - updated)
+    
+    def _take_dirty_state(self):
+        """Collect and reset buffered state changes from every shard"""
+        rows = []
+        for shard in self._shards:
+            dirty, shard["dirty"] = shard["dirty"], {}
+            rows.extend((kind, key, updated) for (kind, key), updated in dirty.items())
+        return rows
+    
+    async def flush_state(self):
+        """Write all buffered state changes to the database in one transaction"""
+        rows = self._take_dirty_state()
+        if rows:
+            expire_before = time.time() - max(_STATE_TTLS.values())
+            try:
+                await self.db.save_bot_state(rows, expire_before=expire_before)
+            except Exception:
+                self._requeue_dirty_state(rows)
+                raise
+        return len(rows)
+    
+    def _requeue_dirty_state(self, rows):
+        """Put unsaved state rows back, keeping any newer change made since"""
+        for kind, key, updated in rows:
+            self._shard(key)["dirty"].setdefault((kind, key), updated)
+    
+    async def _flush_loop(self, interval=30):
+        """Periodically persist chat state"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush_state()
+            except Exception as e:
+                logger.error(f"❌ Error saving chat state: {e}")
+    
+    def start_state_flush(self):
+        """Start the write-behind flush loop (needs a running event loop)"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def shutdown(self):
+        """Stop background loops, persist pending state and close the database"""
+        # Stop a still-running initial sync first so it can't start auto_sync
+        for task in (self._rag_init_task, self._flush_task, self._sync_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
         
-        if now - self.last_greeting[chat_id_str] > timedelta(hours=2):
-            self.last_greeting[chat_id_str] = now
-            return True
+        try:
+            saved = await self.flush_state()
+            logger.info(f"💾 Saved {saved} chat state entries")
+        except Exception as e:
+            logger.error(f"❌ Error saving chat state on shutdown: {e}")
         
-        return False
+        await self._processor.close()
+        _RESPONSE_POOL.shutdown(wait=False, cancel_futures=True)
+        await self.db.close()
+    
+    async def initialize_rag(self):
+        """Load RAG documents and keep them fresh in the background"""
+        success = await self.rag.sync_documents()
+        
+        # Periodic re-sync runs off the hot path; messages keep being
+        # served from the current index while deltas are processed. The first
+        # check waits a full interval so a failed initial sync isn't retried
+        # straight away
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self.rag.auto_sync(initial_delay=600))
+        
+        return success
     
     def get_periodic_greeting(self):
         """Get varied time-based greetings"""
         return self.smart.get_time_based_greeting()
     
     def get_property_posts(self):
-        """Get all real estate properties"""
-        properties = self.kb.get_by_category("Real Estate")
-        return properties if properties else []
+        """Get all real estate properties (cached for 5 minutes)"""
+        if self._properties_cache is not None and time.monotonic() - self._properties_cache_ts < 300:
+            return self._properties_cache
+        
+        properties = self.kb.get_by_category("Real Estate") or []
+        
+        # Only rebuild the rotation when the listings actually changed,
+        # resuming from where the previous rotation left off
+        if properties != self._properties_cache:
+            offset = self.property_rotation_index % len(properties) if properties else 0
+            self._prop_cycle = itertools.cycle(properties[offset:] + properties[:offset])
+        
+        self._properties_cache = properties
+        self._properties_cache_ts = time.monotonic()
+        return properties
     
     def get_next_property(self):
         """Get next property in rotation"""
-        properties = self.get_property_posts()
-        if not properties:
+        if not self.get_property_posts():
             return None
         
-        property = properties[self.property_rotation_index % len(properties)]
         self.property_rotation_index += 1
-        return property
+        return next(self._prop_cycle)
     
-    def generate_response(self, message, response_type, user_id=None):
+    async def generate_response(self, message, response_type, user_id=None):
         """Generate Eva's response - INTELLIGENT COMBINATION of RAG + KB"""
         
         # Clean the query
         original_message = message
-        clean_msg = message.lower().strip()
-        
-        # Remove question marks and punctuation
-        clean_msg = re.sub(r'[?!.,;:]+', ' ', clean_msg)
-        
-        # Remove bot mentions
-        clean_msg = re.sub(r'@[^\s]*', '', clean_msg)
-        
-        # Remove common phrases that don't help search
-        phrases_to_remove = [
-            r'(hey|hello|hi)\s+(eva|bot|namibia\s*bot)',
-            r'tell me about',
-            r'can you tell me',
-            r'i want to know',
-            r'could you',
-            r'would you',
-            r'please',
-            r'what is',
-            r'where is',
-            r'who is',
-            r'how is',
-            r'when is'
-        ]
-        for phrase in phrases_to_remove:
-            clean_msg = re.sub(phrase, '', clean_msg)
+        clean_msg = message.lower().translate(_PUNCT_TABLE)
         
-        clean_msg = clean_msg.strip()
+        # Strip bot mentions and filler phrases in one pass
+        clean_msg = _CLEAN_RE.sub(' ', clean_msg)
+        clean_msg = _SPACES_RE.sub(' ', clean_msg).strip()
         
         if response_type == "search" and clean_msg:
             # ========== INTELLIGENT SEARCH STRATEGY ==========
-            # 1. Search Knowledge Base (from Gist)
-            kb_results = self.kb.search(clean_msg, limit=5)
-            
-            # 2. Search RAG Documents (from GitHub)
-            rag_results = self.rag.search_documents(clean_msg, limit=2) if clean_msg else []
+            # Search Knowledge Base (from Gist) and RAG Documents (from GitHub)
+            # concurrently - both block (SQLite / CSV sync / chunk scoring),
+            # so run them on the response pool and wait for the slower one only.
+            # RAG searches go through the processor, which batches bursts of
+            # queries from busy groups into a single pass over the chunks.
+            loop = asyncio.get_running_loop()
+            kb_results, rag_results = await asyncio.gather(
+                loop.run_in_executor(_RESPONSE_POOL, self.kb.search, clean_msg, 5),
+                self._processor.submit(clean_msg, 2)
+            )
             
             # ========== DECIDE WHICH SOURCE TO USE ==========
             # Check what type of information we have
@@ -458,31 +636,94 @@ eva = EvaGeisesBot()
 # =========================================================
 # MENU SYSTEM (Keep as is - no changes needed)
 # =========================================================
+_CATEGORY_EMOJI = {
+    "Real Estate": "🏠",
+    "Tourism": "🏞️",
+    "History": "📜",
+    "Culture": "👥",
+    "Practical": "ℹ️",
+    "Wildlife": "🦁",
+    "Facts": "🚀",
+    "Geography": "🗺️"
+}
+
+_TOPIC_TEMPLATE = (
+    "{emoji} *{topic}*\n\n"
+    "{content}\n\n"
+    "{keywords}"
+    "📂 *Category:* {category}\n\n"
+    "💡 Ask me more questions or explore other topics!"
+)
+
 class MenuSystem:
+    # Main menu buttons: (label, category)
+    CATEGORIES = (
+        ("🏠 Real Estate", "Real Estate"),
+        ("🏞️ Tourism", "Tourism"),
+        ("🦁 Wildlife", "Wildlife"),
+        ("👥 Culture", "Culture"),
+        ("📜 History", "History"),
+        ("🗺️ Geography", "Geography"),
+        ("ℹ️ Practical Info", "Practical"),
+        ("🚀 Fun Facts", "Facts")
+    )
+    
     def __init__(self, kb):
         self.kb = kb
+        # Keyboards are immutable, so build once and share between users.
+        # They are kept pre-serialized: PTB sends a dict reply_markup as-is
+        # instead of calling to_dict() on the markup for every message
+        self._main_menu = self._build_main_menu()
+        self._back_buttons = {}
+        self._submenus = {}
+        self._descriptions = {}
+        self._topic_views = {}
+        self._kb_version = None
+        self._refresh()
+    
+    def _refresh(self):
+        """Rebuild cached category keyboards and descriptions if the knowledge base changed"""
+        if self._kb_version == self.kb.version:
+            return
+        
+        self._kb_version = self.kb.version
+        self._submenus = {}
+        self._descriptions = {}
+        self._topic_views = {}
+        for _, category in self.CATEGORIES:
+            self._cache_category(category)
+    
+    def _cache_category(self, category):
+        """Build and cache submenu and description for a category"""
+        topics = self.kb.get_by_category(category)
+        self._submenus[category] = self._build_submenu(category, topics)
+        self._descriptions[category] = self._build_description(category, topics)
     
     def main_menu(self):
+        """Get main menu with categories"""
+        return self._main_menu
+    
+    def _build_main_menu(self):
         """Create main menu with categories"""
         keyboard = [
-            [InlineKeyboardButton("🏠 Real Estate", callback_data="cat_Real Estate")],
-            [InlineKeyboardButton("🏞️ Tourism", callback_data="cat_Tourism")],
-            [InlineKeyboardButton("🦁 Wildlife", callback_data="cat_Wildlife")],
-            [InlineKeyboardButton("👥 Culture", callback_data="cat_Culture")],
-            [InlineKeyboardButton("📜 History", callback_data="cat_History")],
-            [InlineKeyboardButton("🗺️ Geography", callback_data="cat_Geography")],
-            [InlineKeyboardButton("ℹ️ Practical Info", callback_data="cat_Practical")],
-            [InlineKeyboardButton("🚀 Fun Facts", callback_data="cat_Facts")]
+            [InlineKeyboardButton(label, callback_data=f"cat_{category}")]
+            for label, category in self.CATEGORIES
         ]
-        return InlineKeyboardMarkup(keyboard)
+        return InlineKeyboardMarkup(keyboard).to_dict()
     
     def create_submenu(self, category):
+        """Get submenu with topics"""
+        self._refresh()
+        if category not in self._submenus:
+            self._cache_category(category)
+        return self._submenus[category]
+    
+    def _build_submenu(self, category, topics):
         """Create submenu with topics"""
-        topics = self.kb.get_by_category(category)
         keyboard = []
         
         for i, topic in enumerate(topics[:8]):
-            topic_name = topic['topic']
+            topic_name = topic.topic
             if len(topic_name) > 35:
                 topic_name = topic_name[:32] + "..."
             keyboard.append([InlineKeyboardButton(
@@ -491,83 +732,192 @@ class MenuSystem:
             )])
         
         keyboard.append([InlineKeyboardButton("🔙 Back to Menu", callback_data="menu_back")])
-        return InlineKeyboardMarkup(keyboard)
+        return InlineKeyboardMarkup(keyboard).to_dict()
     
     def back_button(self, category=None):
+        """Get back button"""
+        markup = self._back_buttons.get(category)
+        if markup is None:
+            markup = self._back_buttons[category] = self._build_back_button(category)
+        return markup
+    
+    def _build_back_button(self, category):
         """Create back button"""
         if category:
             keyboard = [[InlineKeyboardButton("🔙 Back", callback_data=f"cat_{category}")]]
         else:
             keyboard = [[InlineKeyboardButton("🔙 Main Menu", callback_data="menu_back")]]
-        return InlineKeyboardMarkup(keyboard)
+        return InlineKeyboardMarkup(keyboard).to_dict()
     
     def format_category(self, category):
+        """Get category overview"""
+        self._refresh()
+        if category not in self._descriptions:
+            self._cache_category(category)
+        return self._descriptions[category]
+    
+    def _build_description(self, category, topics):
         """Format category overview"""
-        topics = self.kb.get_by_category(category)
-        
-        emoji_map = {
-            "Real Estate": "🏠",
-            "Tourism": "🏞️",
-            "History": "📜",
-            "Culture": "👥",
-            "Practical": "ℹ️",
-            "Wildlife": "🦁",
-            "Facts": "🚀",
-            "Geography": "🗺️"
-        }
-        
-        emoji = emoji_map.get(category, "📌")
+        emoji = _CATEGORY_EMOJI.get(category, "📌")
         
         response = f"{emoji} *{category}*\n\n"
         response += f"📚 {len(topics)} topics available\n\n"
         response += "Select a topic below to learn more:"
         
         return response
+    
+    def topic_view(self, category, index):
+        """Get (text, back button) for a topic, or None if it doesn't exist"""
+        self._refresh()
+        key = (category, index)
+        view = self._topic_views.get(key)
+        if view is None:
+            topics = self.kb.get_by_category(category)
+            if not 0 <= index < len(topics):
+                return None
+            view = self._topic_views[key] = (
+                self._build_topic(category, topics[index]),
+                self.back_button(category)
+            )
+        return view
+    
+    def _build_topic(self, category, topic):
+        """Format topic details"""
+        keywords = topic.keywords.strip()
+        
+        return _TOPIC_TEMPLATE.format(
+            emoji=_CATEGORY_EMOJI.get(category, "📌"),
+            topic=topic.topic,
+            content=topic.content,
+            keywords=f"🏷️ *Keywords:* {keywords}\n\n" if keywords else "",
+            category=category
+        )
 
 menu = MenuSystem(eva.kb)
 
+# =========================================================
+# STATIC TEXT - built once at import, not per command
+# =========================================================
+_MENU_PROMPT = "🇳🇦 *Explore Namibia*\n\nWhat would you like to learn about?"
+
+# Fallback replies are pre-rendered with their keyboards: (text, markup)
+_TOPIC_NOT_FOUND = ("❌ Topic not found. Please try another topic.", menu.back_button())
+
+@lru_cache(maxsize=64)
+def _no_topics_view(category):
+    """Get (text, markup) for a category without topics"""
+    return f"❌ No topics found in {category}", menu.back_button()
+
+_WELCOME_PRIVATE = (
+    "🇳🇦 *Welcome {name}!*\n\n"
+    "I'm *Eva Geises*, your AI guide to Namibia!\n\n"
+    "🦁 *What I can help with:*\n"
+    "• Tourism & Safari information\n"
+    "• Wildlife & Nature\n"
+    "• Culture & History\n"
+    "• Real Estate listings\n"
+    "• Practical travel info\n\n"
+    "💡 *Quick Start:*\n"
+    "/menu - Browse all topics\n"
+    "/properties - View real estate\n"
+    "/help - Get help\n\n"
+    "Just ask me anything about Namibia! 🌟"
+)
+
+_WELCOME_GROUP = (
+    "🇳🇦 *Hello everyone!*\n\n"
+    "I'm Eva Geises, ready to help with Namibia questions!\n\n"
+    "💡 Use /menu or just ask me anything!"
+)
+
+_HELP_BASE = (
+    "🇳🇦 *Eva Geises - Advanced AI Assistant*\n\n"
+    "🎯 *Core Commands:*\n"
+    "/menu - Browse topics by category\n"
+    "/properties - View real estate listings\n"
+    "/topics - List all topics\n"
+    "/help - Show this help\n\n"
+    "🤖 *AI Features:*\n"
+    "/weather - Live Namibia weather\n"
+    "/news - Latest Namibia news\n"
+    "/story - Hear a Namibia story\n"
+    "/brainstorm - Generate ideas\n"
+    "/poll - Create engaging poll\n"
+    "/discuss - Start discussion\n"
+    "/fact - Random Namibia fact\n\n"
+)
+
+_HELP_ADMIN = (
+    "👑 *Admin Commands:*\n"
+    "/test_automation - Test all features\n"
+    "/force_post [type] - Post content now\n"
+    "/activate_group - Activate this group\n"
+    "/add - Add knowledge\n"
+    "/stats - View statistics\n\n"
+    "💡 force_post types: greeting, property, poll, story, weather, news, discuss, brainstorm\n\n"
+)
+
+_HELP_FOOTER = (
+    "💬 *How to use:*\n"
+    "• Ask questions naturally\n"
+    "• Mention topics like 'Etosha', 'Sossusvlei'\n"
+    "• I respond to greetings!\n"
+    "• Use /menu for organized browsing\n\n"
+    "✨ *Examples:*\n"
+    "• \"Where is Namibia?\"\n"
+    "• \"Tell me about Etosha\"\n"
+    "• \"Show me properties\"\n"
+    "• \"/weather\" for live updates\n\n"
+    "🚀 *Automated Features:*\n"
+    "• Greetings every 2 hours\n"
+    "• Property posts 3x daily\n"
+    "• Stories, polls & discussions\n"
+    "• Weather & news updates\n\n"
+    "Need more help? Just ask! 😊"
+)
+
+_HELP_TEXT_USER = _HELP_BASE + _HELP_FOOTER
+_HELP_TEXT_ADMIN = _HELP_BASE + _HELP_ADMIN + _HELP_FOOTER
+
+_PROPERTY_SEP = "─" * 30 + "\n\n"
+
+_PROPERTY_POST = (
+    "🏠 *Featured Property*\n\n"
+    "*{topic}*\n\n"
+    "{content}\n\n"
+    "💡 Use /properties to see all available listings!"
+)
+
+_ADD_USAGE = (
+    "Usage: /add <category> <topic> <content>\n\n"
+    "Example:\n/add Tourism \"Skeleton Coast\" \"The Skeleton Coast is...\""
+)
+
 # =========================================================
 # COMMAND HANDLERS (Keep all existing command handlers - no changes)
 # =========================================================
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Welcome message"""
     user = update.effective_user
-    chat_type = update.effective_chat.type
+    chat = update.effective_chat
+    chat_type = chat.type
     
     # Track user
-    eva.db.add_user(user.id, user.username, user.first_name)
+    await eva.db.add_user(user.id, user.username, user.first_name)
     
     if chat_type == "private":
-        welcome = (
-            f"🇳🇦 *Welcome {user.first_name}!*\n\n"
-            f"I'm *Eva Geises*, your AI guide to Namibia!\n\n"
-            f"🦁 *What I can help with:*\n"
-            f"• Tourism & Safari information\n"
-            f"• Wildlife & Nature\n"
-            f"• Culture & History\n"
-            f"• Real Estate listings\n"
-            f"• Practical travel info\n\n"
-            f"💡 *Quick Start:*\n"
-            f"/menu - Browse all topics\n"
-            f"/properties - View real estate\n"
-            f"/help - Get help\n\n"
-            f"Just ask me anything about Namibia! 🌟"
-        )
+        welcome = _WELCOME_PRIVATE.format(name=user.first_name)
     else:
         # Track group chat
-        eva.db.track_chat(update.effective_chat.id, chat_type, update.effective_chat.title)
-        welcome = (
-            f"🇳🇦 *Hello everyone!*\n\n"
-            f"I'm Eva Geises, ready to help with Namibia questions!\n\n"
-            f"💡 Use /menu or just ask me anything!"
-        )
+        await eva.db.track_chat(chat.id, chat_type, chat.title)
+        welcome = _WELCOME_GROUP
     
     await update.message.reply_text(welcome, parse_mode="Markdown")
 
 async def menu_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show main menu"""
     await update.message.reply_text(
-        "🇳🇦 *Explore Namibia*\n\nWhat would you like to learn about?",
+        _MENU_PROMPT,
         parse_mode="Markdown",
         reply_markup=menu.main_menu()
     )
@@ -582,51 +932,48 @@ async def properties_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return
     
-    response = "🏠 *Available Properties in Namibia*\n\n"
-    
-    for i, prop in enumerate(properties, 1):
-        response += f"*{i}. {prop['topic']}*\n"
-        response += f"{prop['content']}\n\n"
-        response += "─" * 30 + "\n\n"
-    
-    response += "💡 For more information, contact the agent listed in each property!"
+    parts = ["🏠 *Available Properties in Namibia*\n\n"]
+    parts.extend(
+        f"*{i}. {prop.topic}*\n{prop.content}\n\n{_PROPERTY_SEP}"
+        for i, prop in enumerate(properties, 1)
+    )
+    parts.append("💡 For more information, contact the agent listed in each property!")
     
-    await update.message.reply_text(response, parse_mode="Markdown")
+    await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
 async def topics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show all topics by category"""
-    categories = eva.kb.get_categories()
-    
-    response = "📚 *All Topics by Category*\n\n"
+    parts = ["📚 *All Topics by Category*\n\n"]
     
-    for category in sorted(categories):
+    # Categories come pre-sorted and topics as cached tuples from the KB index
+    for category in eva.kb.get_categories():
         topics = eva.kb.get_by_category(category)
-        response += f"*{category}* ({len(topics)})\n"
-        for topic in topics[:3]:
-            response += f"  • {topic['topic']}\n"
+        parts.append(f"*{category}* ({len(topics)})\n")
+        parts.extend(f"  • {topic.topic}\n" for topic in topics[:3])
         if len(topics) > 3:
-            response += f"  ... and {len(topics) - 3} more\n"
-        response += "\n"
+            parts.append(f"  ... and {len(topics) - 3} more\n")
+        parts.append("\n")
     
-    response += "💡 Use /menu to explore topics interactively!"
+    parts.append("💡 Use /menu to explore topics interactively!")
     
-    await update.message.reply_text(response, parse_mode="Markdown")
+    await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show bot statistics - Admin only"""
-    if update.effective_user.id not in ADMIN_IDS:
+    user_id = update.effective_user.id
+    if user_id not in ADMIN_IDS:
         await update.message.reply_text("🔒 This command is only available to administrators.")
         return
     
-    user_stats = eva.db.get_user_stats(update.effective_user.id)
-    total_users = len(eva.db.get_all_users())
-    total_queries = eva.db.get_total_queries()
-    active_chats = eva.db.get_active_chats()
+    user_stats = await eva.db.get_user_stats(user_id)
+    total_users = await eva.db.count_users()
+    total_queries = await eva.db.get_total_queries()
+    active_chat_count = await eva.db.count_active_chats()
     
     response = f"📊 *Bot Statistics*\n\n"
     response += f"👥 Total Users: {total_users}\n"
     response += f"💬 Total Queries: {total_queries}\n"
-    response += f"🏘️ Active Groups: {len(active_chats)}\n"
+    response += f"🏘️ Active Groups: {active_chat_count}\n"
     response += f"📚 Knowledge Topics: {len(eva.kb.get_all_topics())}\n\n"
     response += f"*Your Stats:*\n"
     response += f"Queries: {user_stats['query_count']}\n"
@@ -637,53 +984,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show help"""
     is_admin = update.effective_user.id in ADMIN_IDS
-    
-    help_text = (
-        "🇳🇦 *Eva Geises - Advanced AI Assistant*\n\n"
-        "🎯 *Core Commands:*\n"
-        "/menu - Browse topics by category\n"
-        "/properties - View real estate listings\n"
-        "/topics - List all topics\n"
-        "/help - Show this help\n\n"
-        "🤖 *AI Features:*\n"
-        "/weather - Live Namibia weather\n"
-        "/news - Latest Namibia news\n"
-        "/story - Hear a Namibia story\n"
-        "/brainstorm - Generate ideas\n"
-        "/poll - Create engaging poll\n"
-        "/discuss - Start discussion\n"
-        "/fact - Random Namibia fact\n\n"
-    )
-    
-    if is_admin:
-        help_text += (
-            "👑 *Admin Commands:*\n"
-            "/test_automation - Test all features\n"
-            "/force_post [type] - Post content now\n"
-            "/activate_group - Activate this group\n"
-            "/add - Add knowledge\n"
-            "/stats - View statistics\n\n"
-            "💡 force_post types: greeting, property, poll, story, weather, news, discuss, brainstorm\n\n"
-        )
-    
-    help_text += (
-        "💬 *How to use:*\n"
-        "• Ask questions naturally\n"
-        "• Mention topics like 'Etosha', 'Sossusvlei'\n"
-        "• I respond to greetings!\n"
-        "• Use /menu for organized browsing\n\n"
-        "✨ *Examples:*\n"
-        "• \"Where is Namibia?\"\n"
-        "• \"Tell me about Etosha\"\n"
-        "• \"Show me properties\"\n"
-        "• \"/weather\" for live updates\n\n"
-        "🚀 *Automated Features:*\n"
-        "• Greetings every 2 hours\n"
-        "• Property posts 3x daily\n"
-        "• Stories, polls & discussions\n"
-        "• Weather & news updates\n\n"
-        "Need more help? Just ask! 😊"
-    )
+    help_text = _HELP_TEXT_ADMIN if is_admin else _HELP_TEXT_USER
     
     await update.message.reply_text(help_text, parse_mode="Markdown")
 
@@ -694,10 +995,7 @@ async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     if len(context.args) < 3:
-        await update.message.reply_text(
-            "Usage: /add <category> <topic> <content>\n\n"
-            "Example:\n/add Tourism \"Skeleton Coast\" \"The Skeleton Coast is...\""
-        )
+        await update.message.reply_text(_ADD_USAGE)
         return
     
     category = context.args[0]
@@ -772,19 +1070,19 @@ async def documents_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    response = f"📚 *Document Library* ({len(docs)} documents)\n\n"
+    parts = [f"📚 *Document Library* ({len(docs)} documents)\n\n"]
     
     for i, doc in enumerate(docs[:10], 1):
         filename = doc['filename'].replace('.pdf', '').replace('.docx', '').replace('_', ' ')
-        response += f"{i}. 📄 {filename}\n"
-        response += f"   _{doc['word_count']} words_\n\n"
+        parts.append(f"{i}. 📄 {filename}\n")
+        parts.append(f"   _{doc['word_count']} words_\n\n")
     
     if len(docs) > 10:
-        response += f"...and {len(docs) - 10} more documents\n\n"
+        parts.append(f"...and {len(docs) - 10} more documents\n\n")
     
-    response += "💡 Just ask questions - I'll search through all documents automatically!"
+    parts.append("💡 Just ask questions - I'll search through all documents automatically!")
     
-    await update.message.reply_text(response, parse_mode="Markdown")
+    await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
 async def sync_docs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Sync documents from GitHub - Admin only"""
@@ -814,14 +1112,14 @@ async def rag_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show RAG system statistics"""
     stats = eva.rag.get_stats()
     
-    response = f"📊 *RAG System Statistics*\n\n"
-    response += f"📚 Documents: {stats['total_documents']}\n"
-    response += f"🔍 Chunks: {stats['total_chunks']}\n"
-    response += f"⏰ Last sync: {stats['last_sync'][:19] if stats['last_sync'] != 'Never' else 'Never'}\n"
-    response += f"📁 Source: GitHub\n\n"
-    response += f"💡 Use /documents to see available files!"
+    parts = [f"📊 *RAG System Statistics*\n\n"]
+    parts.append(f"📚 Documents: {stats['total_documents']}\n")
+    parts.append(f"🔍 Chunks: {stats['total_chunks']}\n")
+    parts.append(f"⏰ Last sync: {stats['last_sync'][:19] if stats['last_sync'] != 'Never' else 'Never'}\n")
+    parts.append(f"📁 Source: GitHub\n\n")
+    parts.append(f"💡 Use /documents to see available files!")
     
-    await update.message.reply_text(response, parse_mode="Markdown")
+    await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
 async def test_automation_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Test all automation features - Admin only"""
@@ -832,7 +1130,7 @@ async def test_automation_command(update: Update, context: ContextTypes.DEFAULT_
     chat_id = update.effective_chat.id
     
     # Track this chat as active
-    eva.db.track_chat(chat_id, update.effective_chat.type, update.effective_chat.title or "Test Chat")
+    await eva.db.track_chat(chat_id, update.effective_chat.type, update.effective_chat.title or "Test Chat")
     
     await update.message.reply_text(
         "🧪 *Testing Automation Features*\n\n"
@@ -857,10 +1155,7 @@ async def test_automation_command(update: Update, context: ContextTypes.DEFAULT_
     try:
         property_data = eva.get_next_property()
         if property_data:
-            message = f"🏠 *Featured Property*\n\n"
-            message += f"*{property_data['topic']}*\n\n"
-            message += f"{property_data['content']}\n\n"
-            message += "💡 Use /properties to see all available listings!"
+            message = _PROPERTY_POST.format(topic=property_data.topic, content=property_data.content)
             await update.message.reply_text(message, parse_mode="Markdown")
             await asyncio.sleep(2)
     except Exception as e:
@@ -885,97 +1180,78 @@ async def test_automation_command(update: Update, context: ContextTypes.DEFAULT_
         parse_mode="Markdown"
     )
 
+# Types picked from when /force_post is given no (or an unknown) type
+_FORCE_POST_RANDOM_TYPES = ("poll", "story", "weather", "news", "discuss", "brainstorm", "fact")
+
+async def _force_post_dispatch(content_type, update, context, chat_id):
+    """Post one piece of content of the given type to the current chat"""
+    if content_type == "greeting":
+        greeting = eva.get_periodic_greeting()
+        await update.message.reply_text(greeting, parse_mode="Markdown")
+    
+    elif content_type == "property":
+        property_data = eva.get_next_property()
+        if property_data:
+            message = _PROPERTY_POST.format(topic=property_data.topic, content=property_data.content)
+            await update.message.reply_text(message, parse_mode="Markdown")
+        else:
+            await update.message.reply_text("❌ No properties available")
+    
+    elif content_type == "poll":
+        poll_data = eva.ai.generate_poll()
+        await context.bot.send_poll(
+            chat_id=chat_id,
+            question=poll_data["question"],
+            options=poll_data["options"],
+            is_anonymous=False
+        )
+    
+    elif content_type == "story":
+        story = eva.ai.tell_namibia_story()
+        await update.message.reply_text(story, parse_mode="Markdown")
+    
+    elif content_type == "weather":
+        weather = await eva.ai.get_namibia_weather()
+        await update.message.reply_text(weather, parse_mode="Markdown")
+    
+    elif content_type == "news":
+        news = await eva.ai.get_namibia_news()
+        await update.message.reply_text(news, parse_mode="Markdown")
+    
+    elif content_type == "discuss":
+        discussion = eva.ai.generate_discussion_topic()
+        await update.message.reply_text(discussion, parse_mode="Markdown")
+    
+    elif content_type == "brainstorm":
+        ideas = eva.ai.generate_brainstorm_ideas()
+        await update.message.reply_text(ideas, parse_mode="Markdown")
+    
+    else:
+        fact = eva.ai.get_random_fact()
+        await update.message.reply_text(fact, parse_mode="Markdown")
+
 async def force_post_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Force post content now - Admin only"""
     if update.effective_user.id not in ADMIN_IDS:
         await update.message.reply_text("🔒 This command is only available to administrators.")
         return
     
-    chat_id = update.effective_chat.id
+    chat = update.effective_chat
+    chat_id = chat.id
     
     # Track chat
-    eva.db.track_chat(chat_id, update.effective_chat.type, update.effective_chat.title or "Group")
+    await eva.db.track_chat(chat_id, chat.type, chat.title or "Group")
     
     # Determine what to post
     args = context.args
     content_type = args[0].lower() if args else "random"
     
     try:
-        if content_type == "greeting":
-            greeting = eva.get_periodic_greeting()
-            await update.message.reply_text(greeting, parse_mode="Markdown")
-        
-        elif content_type == "property":
-            property_data = eva.get_next_property()
-            if property_data:
-                message = f"🏠 *Featured Property*\n\n"
-                message += f"*{property_data['topic']}*\n\n"
-                message += f"{property_data['content']}\n\n"
-                message += "💡 Use /properties to see all available listings!"
-                await update.message.reply_text(message, parse_mode="Markdown")
-            else:
-                await update.message.reply_text("❌ No properties available")
-        
-        elif content_type == "poll":
-            poll_data = eva.ai.generate_poll()
-            await context.bot.send_poll(
-                chat_id=chat_id,
-                question=poll_data["question"],
-                options=poll_data["options"],
-                is_anonymous=False
-            )
-        
-        elif content_type == "story":
-            story = eva.ai.tell_namibia_story()
-            await update.message.reply_text(story, parse_mode="Markdown")
-        
-        elif content_type == "weather":
-            weather = await eva.ai.get_namibia_weather()
-            await update.message.reply_text(weather, parse_mode="Markdown")
-        
-        elif content_type == "news":
-            news = await eva.ai.get_namibia_news()
-            await update.message.reply_text(news, parse_mode="Markdown")
-        
-        elif content_type == "discuss":
-            discussion = eva.ai.generate_discussion_topic()
-            await update.message.reply_text(discussion, parse_mode="Markdown")
-        
-        elif content_type == "brainstorm":
-            ideas = eva.ai.generate_brainstorm_ideas()
-            await update.message.reply_text(ideas, parse_mode="Markdown")
-        
+        if content_type in ("greeting", "property") or content_type in _FORCE_POST_RANDOM_TYPES:
+            await _force_post_dispatch(content_type, update, context, chat_id)
         else:
             # Random content
-            content_types = ["poll", "story", "weather", "news", "discuss", "brainstorm", "fact"]
-            random_type = random.choice(content_types)
-            
-            if random_type == "poll":
-                poll_data = eva.ai.generate_poll()
-                await context.bot.send_poll(
-                    chat_id=chat_id,
-                    question=poll_data["question"],
-                    options=poll_data["options"],
-                    is_anonymous=False
-                )
-            elif random_type == "story":
-                story = eva.ai.tell_namibia_story()
-                await update.message.reply_text(story, parse_mode="Markdown")
-            elif random_type == "weather":
-                weather = await eva.ai.get_namibia_weather()
-                await update.message.reply_text(weather, parse_mode="Markdown")
-            elif random_type == "news":
-                news = await eva.ai.get_namibia_news()
-                await update.message.reply_text(news, parse_mode="Markdown")
-            elif random_type == "discuss":
-                discussion = eva.ai.generate_discussion_topic()
-                await update.message.reply_text(discussion, parse_mode="Markdown")
-            elif random_type == "brainstorm":
-                ideas = eva.ai.generate_brainstorm_ideas()
-                await update.message.reply_text(ideas, parse_mode="Markdown")
-            else:
-                fact = eva.ai.get_random_fact()
-                await update.message.reply_text(fact, parse_mode="Markdown")
+            await _force_post_dispatch(random.choice(_FORCE_POST_RANDOM_TYPES), update, context, chat_id)
         
         logger.info(f"✅ Force posted: {content_type}")
     
@@ -989,15 +1265,16 @@ async def activate_group_command(update: Update, context: ContextTypes.DEFAULT_T
         await update.message.reply_text("🔒 This command is only available to administrators.")
         return
     
-    chat_id = update.effective_chat.id
-    chat_type = update.effective_chat.type
-    chat_title = update.effective_chat.title or "Private Chat"
+    chat = update.effective_chat
+    chat_id = chat.id
+    chat_type = chat.type
+    chat_title = chat.title or "Private Chat"
     
     # Track chat as active
-    eva.db.track_chat(chat_id, chat_type, chat_title)
+    await eva.db.track_chat(chat_id, chat_type, chat_title)
     
     # Verify it's in active chats
-    active_chats = eva.db.get_active_chats()
+    active_chats = await eva.db.get_active_chats()
     is_active = any(chat['chat_id'] == chat_id for chat in active_chats)
     
     if is_active:
@@ -1028,123 +1305,136 @@ async def activate_group_command(update: Update, context: ContextTypes.DEFAULT_T
 async def diagnose_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Diagnose automation issues - Shows detailed status"""
     user_id = update.effective_user.id
-    chat_id = update.effective_chat.id
+    chat = update.effective_chat
+    chat_id = chat.id
     
     # Check if user is admin
     is_admin = user_id in ADMIN_IDS
     
-    report = f"🔍 *Eva Geises Diagnostic Report*\n\n"
+    # The database and knowledge base probes are independent - run them
+    # concurrently; failures come back as exceptions and are reported below
+    loop = asyncio.get_running_loop()
+    active_chats, kb_results = await asyncio.gather(
+        eva.db.get_active_chats(),
+        loop.run_in_executor(_RESPONSE_POOL, eva.kb.search, "Namibia", 1),
+        return_exceptions=True
+    )
+    
+    parts = [f"🔍 *Eva Geises Diagnostic Report*\n\n"]
     
     # 1. User Info
-    report += f"👤 *Your Info:*\n"
-    report += f"User ID: `{user_id}`\n"
-    report += f"Is Admin: {'✅ YES' if is_admin else '❌ NO - Add to ADMIN_IDS!'}\n\n"
+    parts.append(f"👤 *Your Info:*\n")
+    parts.append(f"User ID: `{user_id}`\n")
+    parts.append(f"Is Admin: {'✅ YES' if is_admin else '❌ NO - Add to ADMIN_IDS!'}\n\n")
     
     if ADMIN_IDS:
-        report += f"Current ADMIN_IDS: `{', '.join(map(str, ADMIN_IDS))}`\n\n"
+        parts.append(f"Current ADMIN_IDS: `{', '.join(map(str, ADMIN_IDS))}`\n\n")
     else:
-        report += f"⚠️ ADMIN_IDS not set in environment!\n\n"
+        parts.append(f"⚠️ ADMIN_IDS not set in environment!\n\n")
     
     # 2. Chat Info
-    report += f"💬 *Chat Info:*\n"
-    report += f"Chat ID: `{chat_id}`\n"
-    report += f"Chat Type: {update.effective_chat.type}\n"
-    report += f"Chat Title: {update.effective_chat.title or 'N/A'}\n\n"
+    parts.append(f"💬 *Chat Info:*\n")
+    parts.append(f"Chat ID: `{chat_id}`\n")
+    parts.append(f"Chat Type: {chat.type}\n")
+    parts.append(f"Chat Title: {chat.title or 'N/A'}\n\n")
     
     # 3. Database Status
     try:
-        active_chats = eva.db.get_active_chats()
+        if isinstance(active_chats, Exception):
+            raise active_chats
         is_tracked = any(chat['chat_id'] == chat_id for chat in active_chats)
         
-        report += f"💾 *Database Status:*\n"
-        report += f"This chat tracked: {'✅ YES' if is_tracked else '❌ NO - Use /activate_group'}\n"
-        report += f"Total active chats: {len(active_chats)}\n\n"
+        parts.append(f"💾 *Database Status:*\n")
+        parts.append(f"This chat tracked: {'✅ YES' if is_tracked else '❌ NO - Use /activate_group'}\n")
+        parts.append(f"Total active chats: {len(active_chats)}\n\n")
     except Exception as e:
-        report += f"💾 *Database Status:* ❌ Error: {e}\n\n"
+        parts.append(f"💾 *Database Status:* ❌ Error: {e}\n\n")
     
     # 4. Features Status
-    report += f"🤖 *Features Status:*\n"
+    parts.append(f"🤖 *Features Status:*\n")
     try:
         # Test knowledge base
-        results = eva.kb.search("Namibia", limit=1)
-        report += f"Knowledge Base: {'✅ Working (' + str(len(eva.kb.get_all_topics())) + ' topics)' if results else '⚠️ No data'}\n"
+        if isinstance(kb_results, Exception):
+            raise kb_results
+        parts.append(f"Knowledge Base: {'✅ Working (' + str(len(eva.kb.get_all_topics())) + ' topics)' if kb_results else '⚠️ No data'}\n")
         
         # Test properties
         properties = eva.get_property_posts()
-        report += f"Properties: {'✅ ' + str(len(properties)) + ' available' if properties else '❌ None found'}\n"
+        parts.append(f"Properties: {'✅ ' + str(len(properties)) + ' available' if properties else '❌ None found'}\n")
         
         # Test AI features
-        report += f"Advanced AI: {'✅ Loaded' if hasattr(eva, 'ai') else '❌ Not loaded'}\n"
-        report += f"Smart Features: {'✅ Loaded' if hasattr(eva, 'smart') else '❌ Not loaded'}\n"
+        parts.append(f"Advanced AI: {'✅ Loaded' if hasattr(eva, 'ai') else '❌ Not loaded'}\n")
+        parts.append(f"Smart Features: {'✅ Loaded' if hasattr(eva, 'smart') else '❌ Not loaded'}\n")
         
     except Exception as e:
-        report += f"❌ Error testing features: {e}\n"
+        parts.append(f"❌ Error testing features: {e}\n")
     
-    report += "\n"
+    parts.append("\n")
     
     # 5. Job Queue Status
     try:
         if hasattr(context.application, 'job_queue') and context.application.job_queue:
             jobs = context.application.job_queue.jobs()
-            report += f"⏰ *Job Queue Status:*\n"
-            report += f"Job Queue: ✅ Active ({len(jobs)} jobs)\n"
+            parts.append(f"⏰ *Job Queue Status:*\n")
+            parts.append(f"Job Queue: ✅ Active ({len(jobs)} jobs)\n")
             
             job_names = [job.name for job in jobs if hasattr(job, 'name') and job.name]
             if job_names:
-                report += f"\n*Scheduled Jobs:*\n"
+                parts.append(f"\n*Scheduled Jobs:*\n")
                 for name in job_names:
-                    report += f"• {name}\n"
+                    parts.append(f"• {name}\n")
         else:
-            report += f"⏰ *Job Queue Status:* ❌ NOT ACTIVE\n"
-            report += f"⚠️ Automated posts won't work!\n"
+            parts.append(f"⏰ *Job Queue Status:* ❌ NOT ACTIVE\n")
+            parts.append(f"⚠️ Automated posts won't work!\n")
     except Exception as e:
-        report += f"⏰ *Job Queue Status:* ❌ Error: {e}\n"
+        parts.append(f"⏰ *Job Queue Status:* ❌ Error: {e}\n")
     
-    report += "\n"
+    parts.append("\n")
     
     # 6. Fix Instructions
-    report += f"🔧 *How to Fix:*\n"
+    parts.append(f"🔧 *How to Fix:*\n")
     
     if not ADMIN_IDS:
-        report += f"1. ⚠️ Set ADMIN_IDS in Render:\n"
-        report += f"   Environment variable: `ADMIN_IDS={user_id}`\n\n"
+        parts.append(f"1. ⚠️ Set ADMIN_IDS in Render:\n")
+        parts.append(f"   Environment variable: `ADMIN_IDS={user_id}`\n\n")
     elif not is_admin:
-        report += f"1. ⚠️ Add yourself to ADMIN_IDS:\n"
-        report += f"   Change to: `ADMIN_IDS={','.join(map(str, list(ADMIN_IDS) + [user_id]))}`\n\n"
+        parts.append(f"1. ⚠️ Add yourself to ADMIN_IDS:\n")
+        parts.append(f"   Change to: `ADMIN_IDS={','.join(map(str, list(ADMIN_IDS) + [user_id]))}`\n\n")
     
     if not is_tracked and is_admin:
-        report += f"2. Activate this chat: /activate_group\n\n"
+        parts.append(f"2. Activate this chat: /activate_group\n\n")
     
     if not hasattr(context.application, 'job_queue') or not context.application.job_queue:
-        report += f"3. ❌ Job Queue not working! Use manual posting:\n"
-        report += f"   /force_post - Post content manually\n\n"
+        parts.append(f"3. ❌ Job Queue not working! Use manual posting:\n")
+        parts.append(f"   /force_post - Post content manually\n\n")
     
     if is_admin:
-        report += f"💡 *Admin Commands:*\n"
-        report += f"/activate_group - Activate automation\n"
-        report += f"/test_automation - Test all features\n"
-        report += f"/force_post [type] - Manual posting\n"
+        parts.append(f"💡 *Admin Commands:*\n")
+        parts.append(f"/activate_group - Activate automation\n")
+        parts.append(f"/test_automation - Test all features\n")
+        parts.append(f"/force_post [type] - Manual posting\n")
     
-    await update.message.reply_text(report, parse_mode="Markdown")
+    await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
 # =========================================================
 # MESSAGE HANDLERS (Keep as is)
 # =========================================================
 async def handle_new_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Welcome new group members"""
+    chat = update.effective_chat
+    chat_tracked = False
+    
     for member in update.message.new_chat_members:
         if member.is_bot:
             continue
         
-        # Track chat
-        eva.db.track_chat(
-            update.effective_chat.id,
-            update.effective_chat.type,
-            update.effective_chat.title
-        )
+        # Track chat once per update, not once per member
+        if not chat_tracked:
+            await eva.db.track_chat(chat.id, chat.type, chat.title)
+            chat_tracked = True
         
         # Track user
-        eva.db.add_user(member.id, member.username, member.first_name)
+        await eva.db.add_user(member.id, member.username, member.first_name)
         
         # Send varied welcome
         name = member.first_name or member.username or "friend"
@@ -1161,24 +1451,28 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
     chat = update.effective_chat
     message = update.message.text
     
-    # Track chat activity
-    eva.db.track_chat(chat.id, chat.type, chat.title)
-    eva.db.add_user(user.id, user.username, user.first_name)
-    
     # Check for spam
     is_spam, warning_level = eva.smart.check_spam(user.id, chat.id)
     if is_spam and warning_level > 0:
+        await eva.db.log_message(user.id, user.username, user.first_name, chat.id, chat.type, chat.title)
         warning_msg = eva.smart.get_spam_warning(warning_level, user.first_name or "friend")
         await update.message.reply_text(warning_msg, parse_mode="Markdown")
         return
     
     # Analyze if Eva should respond
     should_respond, response_type = eva.analyze_message(message, user.id, chat.id)
+    responding = bool(should_respond and response_type)
+    
+    # Track user, chat activity and (when answered) the query in one commit
+    await eva.db.log_message(
+        user.id, user.username, user.first_name,
+        chat.id, chat.type, chat.title,
+        query=message if responding else None
+    )
     
-    if should_respond and response_type:
+    if responding:
         logger.info(f"Eva responding: {message[:50]}... ({response_type})")
-        eva.db.log_query(user.id, message)
-        response = eva.generate_response(message, response_type, user_id=user.id)
+        response = await eva.generate_response(message, response_type, user_id=user.id)
         
         if response:
             # Natural delay before responding
@@ -1202,9 +1496,8 @@ async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_T
     user = update.effective_user
     message = update.message.text
     
-    # Track user
-    eva.db.add_user(user.id, user.username, user.first_name)
-    eva.db.log_query(user.id, message)
+    # Track user and query
+    await eva.db.log_message(user.id, user.username, user.first_name, query=message)
     
     # Always respond in private chats
     should_respond, response_type = eva.analyze_message(message, user.id, update.effective_chat.id)
@@ -1212,7 +1505,7 @@ async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_T
     if not should_respond:
         response_type = "search"
     
-    response = eva.generate_response(message, response_type, user_id=user.id)
+    response = await eva.generate_response(message, response_type, user_id=user.id)
     
     if response:
         await update.message.reply_text(response, parse_mode="Markdown")
@@ -1225,6 +1518,49 @@ async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_T
 # =========================================================
 # AUTOMATED JOBS (Keep as is)
 # =========================================================
+# Broadcasts overlap their sends instead of sleeping between chats. One
+# limiter is shared by every job, so overlapping broadcasts together stay
+# at 25 sends/second - below Telegram's global limit of 30 messages/second
+_TG_LIMITER = AsyncLimiter(25, 1)
+
+# A 429 (RetryAfter) applies to the whole bot, so every broadcast send
+# waits until it has expired (time.monotonic() deadline)
+_retry_after_until = 0.0
+
+async def _send_one(chat_id, send, label, attempts=2):
+    """Run one broadcast send under the global rate limit"""
+    global _retry_after_until
+    
+    for _ in range(attempts):
+        delay = _retry_after_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        async with _TG_LIMITER:
+            try:
+                if await send(chat_id):
+                    logger.info(f"✅ {label} sent to chat {chat_id}")
+                return
+            except RetryAfter as e:
+                _retry_after_until = max(_retry_after_until, time.monotonic() + e.retry_after)
+                logger.warning(f"⏳ Rate limited sending {label.lower()} to chat {chat_id} - retrying in {e.retry_after}s")
+            except Exception as e:
+                logger.error(f"❌ Failed to send {label.lower()} to chat {chat_id}: {e}")
+                # Blocked/kicked (Forbidden) or deleted chats won't accept posts again
+                if isinstance(e, Forbidden) or (isinstance(e, BadRequest) and "chat not found" in e.message.lower()):
+                    await eva.db.deactivate_chat(chat_id)
+                    logger.info(f"🔇 Deactivated chat {chat_id}")
+                return
+    
+    logger.error(f"❌ Gave up sending {label.lower()} to chat {chat_id} after rate limiting")
+
+async def _broadcast(chat_ids, send, label):
+    """Send to many chats concurrently - send(chat_id) returns falsy when skipped"""
+    await asyncio.gather(
+        *(_send_one(chat_id, send, label) for chat_id in chat_ids),
+        return_exceptions=True
+    )
+
 async def post_daily_property(context: ContextTypes.DEFAULT_TYPE):
     """Post daily property to groups"""
     try:
@@ -1235,32 +1571,44 @@ async def post_daily_property(context: ContextTypes.DEFAULT_TYPE):
             logger.info("📭 No properties available")
             return
         
-        active_chats = eva.db.get_active_chats()
+        active_chats = await eva.db.get_active_chats()
         
         if not active_chats:
             logger.info("📭 No active chats for property posts")
             return
         
-        message = f"🏠 *Featured Property*\n\n"
-        message += f"*{property_data['topic']}*\n\n"
-        message += f"{property_data['content']}\n\n"
-        message += "💡 Use /properties to see all available listings!"
+        message = _PROPERTY_POST.format(topic=property_data.topic, content=property_data.content)
         
-        for chat in active_chats:
-            chat_id = chat['chat_id']
-            
+        # Render the Markdown once in the staging chat, then copy it by id
+        staged = None
+        if STAGING_CHAT_ID:
             try:
-                await context.bot.send_message(
-                    chat_id=chat_id,
+                staged = await context.bot.send_message(
+                    chat_id=STAGING_CHAT_ID,
                     text=message,
                     parse_mode="Markdown"
                 )
-                logger.info(f"✅ Property posted to chat {chat_id}")
-                await asyncio.sleep(3)
             except Exception as e:
-                logger.error(f"❌ Failed to post property to chat {chat_id}: {e}")
-                if "bot was blocked" in str(e).lower() or "chat not found" in str(e).lower():
-                    eva.db.deactivate_chat(chat_id)
+                logger.error(f"❌ Failed to stage property post, sending directly: {e}")
+        
+        async def send(chat_id):
+            if staged:
+                return await context.bot.copy_message(
+                    chat_id=chat_id,
+                    from_chat_id=STAGING_CHAT_ID,
+                    message_id=staged.message_id
+                )
+            return await context.bot.send_message(
+                chat_id=chat_id,
+                text=message,
+                parse_mode="Markdown"
+            )
+        
+        await _broadcast(
+            [chat['chat_id'] for chat in active_chats if chat['chat_id'] != STAGING_CHAT_ID],
+            send,
+            "Property"
+        )
         
         logger.info("✅ Daily property post complete")
     except Exception as e:
@@ -1274,32 +1622,22 @@ async def send_periodic_greetings(context: ContextTypes.DEFAULT_TYPE):
     """Send periodic greetings to active groups"""
     try:
         logger.info("👋 Starting periodic greetings...")
-        active_chats = eva.db.get_active_chats()
+        active_chats = await eva.db.get_active_chats()
         
         if not active_chats:
             logger.info("📭 No active chats for greetings")
             return
         
-        for chat in active_chats:
-            chat_id = chat['chat_id']
-            
-            # Check if this chat should receive greeting
-            if eva.should_send_greeting(chat_id):
-                greeting = eva.get_periodic_greeting()
-                
-                try:
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=greeting,
-                        parse_mode="Markdown"
-                    )
-                    logger.info(f"✅ Greeting sent to chat {chat_id}")
-                    await asyncio.sleep(2)
-                except Exception as e:
-                    logger.error(f"❌ Failed to send greeting to chat {chat_id}: {e}")
-                    if "bot was blocked" in str(e).lower() or "chat not found" in str(e).lower():
-                        eva.db.deactivate_chat(chat_id)
-                        logger.info(f"🔇 Deactivated chat {chat_id}")
+        # Check which chats should receive a greeting
+        await _broadcast(
+            [chat['chat_id'] for chat in active_chats if eva.should_send_greeting(chat['chat_id'])],
+            lambda chat_id: context.bot.send_message(
+                chat_id=chat_id,
+                text=eva.get_periodic_greeting(),
+                parse_mode="Markdown"
+            ),
+            "Greeting"
+        )
         
         logger.info("✅ Periodic greetings complete")
     except Exception as e:
@@ -1309,7 +1647,7 @@ async def send_engagement_content(context: ContextTypes.DEFAULT_TYPE):
     """Send engagement content (polls, questions, facts, stories, weather)"""
     try:
         logger.info("🎯 Starting engagement content...")
-        active_chats = eva.db.get_active_chats()
+        active_chats = await eva.db.get_active_chats()
         
         if not active_chats:
             logger.info("📭 No active chats for engagement")
@@ -1336,180 +1674,273 @@ async def send_engagement_content(context: ContextTypes.DEFAULT_TYPE):
             # Other times: Mix
             content_type = random.choice(engagement_types)
         
-        for chat in active_chats:
-            chat_id = chat['chat_id']
-            chat_id_str = str(chat_id)
+        # Generate the content once and send the same payload to every chat;
+        # the per-chat checks only decide whether a chat receives it
+        if content_type == "poll":
+            payload = eva.ai.generate_poll()
+        elif content_type == "story":
+            payload = eva.ai.tell_namibia_story()
+        elif content_type == "weather":
+            payload = await eva.ai.get_namibia_weather()
+        elif content_type == "news":
+            payload = await eva.ai.get_namibia_news()
+        elif content_type == "brainstorm":
+            payload = eva.ai.generate_brainstorm_ideas()
+        elif content_type == "discussion":
+            payload = eva.ai.generate_discussion_topic()
+        else:
+            payload = eva.ai.get_random_fact()
+        
+        should_send = {
+            "poll": eva.ai.should_send_poll,
+            "story": eva.ai.should_tell_story,
+            "weather": eva.ai.should_send_weather
+        }.get(content_type)
+        
+        # Filter before broadcasting so skipped chats don't use rate-limit slots
+        chat_ids = [
+            chat['chat_id'] for chat in active_chats
+            if not should_send or should_send(str(chat['chat_id']))
+        ]
+        
+        async def send(chat_id):
+            """Send this run's content to one chat"""
+            if content_type == "poll":
+                return await context.bot.send_poll(
+                    chat_id=chat_id,
+                    question=payload["question"],
+                    options=payload["options"],
+                    is_anonymous=False
+                )
             
-            try:
-                # Generate appropriate content
-                if content_type == "poll":
-                    if eva.ai.should_send_poll(chat_id_str):
-                        poll_data = eva.ai.generate_poll()
-                        await context.bot.send_poll(
-                            chat_id=chat_id,
-                            question=poll_data["question"],
-                            options=poll_data["options"],
-                            is_anonymous=False
-                        )
-                        logger.info(f"✅ Poll sent to chat {chat_id}")
-                
-                elif content_type == "story":
-                    if eva.ai.should_tell_story(chat_id_str):
-                        story = eva.ai.tell_namibia_story()
-                        await context.bot.send_message(
-                            chat_id=chat_id,
-                            text=story,
-                            parse_mode="Markdown"
-                        )
-                        logger.info(f"✅ Story sent to chat {chat_id}")
-                
-                elif content_type == "weather":
-                    if eva.ai.should_send_weather(chat_id_str):
-                        weather = await eva.ai.get_namibia_weather()
-                        await context.bot.send_message(
-                            chat_id=chat_id,
-                            text=weather,
-                            parse_mode="Markdown"
-                        )
-                        logger.info(f"✅ Weather sent to chat {chat_id}")
-                
-                elif content_type == "news":
-                    news = await eva.ai.get_namibia_news()
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=news,
-                        parse_mode="Markdown"
-                    )
-                    logger.info(f"✅ News sent to chat {chat_id}")
-                
-                elif content_type == "brainstorm":
-                    ideas = eva.ai.generate_brainstorm_ideas()
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=ideas,
-                        parse_mode="Markdown"
-                    )
-                    logger.info(f"✅ Brainstorm sent to chat {chat_id}")
-                
-                elif content_type == "discussion":
-                    topic = eva.ai.generate_discussion_topic()
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=topic,
-                        parse_mode="Markdown"
-                    )
-                    logger.info(f"✅ Discussion sent to chat {chat_id}")
-                
-                elif content_type == "fact":
-                    fact = eva.ai.get_random_fact()
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=fact,
-                        parse_mode="Markdown"
-                    )
-                    logger.info(f"✅ Fact sent to chat {chat_id}")
-                
-                await asyncio.sleep(3)  # Avoid rate limiting
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to send engagement to chat {chat_id}: {e}")
-                if "bot was blocked" in str(e).lower() or "chat not found" in str(e).lower():
-                    eva.db.deactivate_chat(chat_id)
+            return await context.bot.send_message(
+                chat_id=chat_id,
+                text=payload,
+                parse_mode="Markdown"
+            )
+        
+        await _broadcast(
+            chat_ids,
+            send,
+            content_type.capitalize()
+        )
         
         logger.info("✅ Engagement content complete")
     except Exception as e:
         logger.error(f"❌ Error in engagement content: {e}")
 
+# Last (text, markup) each button message was edited to, keyed by
+# (chat_id, message_id). Markups are cached objects, so identity is enough
+_last_edits = TTLCache(maxsize=4096, ttl=3600)
+
+async def _safe_edit(query, text, markup):
+    """Edit a button message, skipping edits that wouldn't change it"""
+    message = query.message
+    key = (message.chat_id, message.message_id) if message else None
+    last = _last_edits.get(key) if key else None
+    if last is not None and last[0] == text and last[1] is markup:
+        return
+    
+    try:
+        await query.edit_message_text(text, parse_mode="Markdown", reply_markup=markup)
+    except BadRequest as e:
+        if "message is not modified" not in e.message.lower():
+            raise
+    
+    if key:
+        _last_edits[key] = (text, markup)
+
+async def _handle_menu(query, rest):
+    """Show the main menu ("menu_back")"""
+    if rest == "back":
+        await _safe_edit(query, _MENU_PROMPT, menu.main_menu())
+
+async def _handle_category(query, category):
+    """Show a category's topics ("cat_<category>")"""
+    # Unknown or empty categories get a cached fallback, which also keeps
+    # arbitrary callback data out of the menu caches
+    if not eva.kb.get_by_category(category):
+        text, markup = _no_topics_view(category)
+        await _safe_edit(query, text, markup)
+        return
+    
+    content = menu.format_category(category)
+    
+    await _safe_edit(query, content, menu.create_submenu(category))
+
+async def _handle_topic(query, rest):
+    """Show a topic ("topic_<category>_<index>")"""
+    # The category itself may contain "_"
+    category, _, index_str = rest.rpartition("_")
+    if category:
+        topic_index = int(index_str) if index_str.isascii() and index_str.isdigit() else 0
+        
+        # Rendered topics are cached per knowledge-base version
+        view = menu.topic_view(category, topic_index)
+        
+        if view:
+            response, markup = view
+            await _safe_edit(query, response, markup)
+            return
+    
+    text, markup = _TOPIC_NOT_FOUND
+    await _safe_edit(query, text, markup)
+
+# Callback data is "<prefix>_<rest>"; route on the prefix
+_ROUTES = {
+    "menu": _handle_menu,
+    "cat": _handle_category,
+    "topic": _handle_topic,
+}
+
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle buttons"""
     query = update.callback_query
-    await query.answer()
+    # Acknowledge the press while the reply is prepared and sent, so the
+    # client's loading spinner doesn't wait on the edit round trip
+    ack = asyncio.create_task(query.answer())
     
-    data = query.data
+    prefix, _, rest = query.data.partition("_")
+    handler = _ROUTES.get(prefix)
     
-    # Main menu
-    if data == "menu_back":
-        await query.edit_message_text(
-            "🇳🇦 *Explore Namibia*\n\nWhat would you like to learn about?",
-            parse_mode="Markdown",
-            reply_markup=menu.main_menu()
-        )
-    
-    # Category selection
-    elif data.startswith("cat_"):
-        category = data.replace("cat_", "")
-        content = menu.format_category(category)
-        
-        await query.edit_message_text(
-            content,
-            parse_mode="Markdown",
-            reply_markup=menu.create_submenu(category)
-        )
-    
-    # Topic selection
-    elif data.startswith("topic_"):
-        parts = data.split("_")
-        if len(parts) >= 3:
-            category = "_".join(parts[1:-1])
-            try:
-                topic_index = int(parts[-1])
-            except:
-                topic_index = 0
-            
-            topics = eva.kb.get_by_category(category)
-            
-            if topics and 0 <= topic_index < len(topics):
-                topic = topics[topic_index]
-                
-                emoji_map = {
-                    "Real Estate": "🏠",
-                    "Tourism": "🏞️", "History": "📜", "Culture": "👥",
-                    "Practical": "ℹ️", "Wildlife": "🦁", "Facts": "🚀",
-                    "Geography": "🗺️"
-                }
-                
-                emoji = emoji_map.get(category, "📌")
-                
-                response = f"{emoji} *{topic['topic']}*\n\n"
-                response += f"{topic['content']}\n\n"
-                
-                if topic.get('keywords'):
-                    keywords = topic['keywords'].strip()
-                    if keywords:
-                        response += f"🏷️ *Keywords:* {keywords}\n\n"
-                
-                response += f"📂 *Category:* {category}\n\n"
-                response += "💡 Ask me more questions or explore other topics!"
-                
-                await query.edit_message_text(
-                    response,
-                    parse_mode="Markdown",
-                    reply_markup=menu.back_button(category)
-                )
-                return
-        
-        await query.edit_message_text(
-            "❌ Topic not found. Please try another topic.",
-            parse_mode="Markdown",
-            reply_markup=menu.back_button()
-        )
+    try:
+        if handler:
+            await handler(query, rest)
+    finally:
+        await ack
 
 # =========================================================
 # MAIN (Keep as is)
 # =========================================================
+async def post_init(application: Application):
+    """Start background work and load RAG documents once the event loop is running"""
+    await eva.load_state()
+    eva.start_state_flush()
+    
+    # Documents sync in the background so the webhook starts serving at once
+    eva._rag_init_task = asyncio.create_task(_initialize_rag())
+    logger.info("📚 RAG documents initializing in background")
+
+async def post_shutdown(application: Application):
+    """Persist state once updates and running jobs have drained"""
+    await eva.shutdown()
+
+async def _initialize_rag():
+    """Load RAG documents, logging the outcome"""
+    try:
+        if await eva.initialize_rag():
+            logger.info("✅ RAG documents loaded - auto-sync every hour")
+        else:
+            logger.warning("⚠️ Initial RAG sync failed - auto-sync will retry")
+    except Exception as e:
+        logger.error(f"❌ RAG initialization error: {e}")
+
+# Daily property post times
+_PROPERTY_POST_TIMES = (dt_time(10, 0), dt_time(14, 0), dt_time(18, 0))
+
+# Bot commands: (command, handler)
+_COMMANDS = (
+    ('start', start),
+    ('menu', menu_command),
+    ('properties', properties_command),
+    ('topics', topics_command),
+    ('stats', stats_command),
+    ('help', help_command),
+    ('add', add_command),
+    
+    # Advanced AI Commands
+    ('weather', weather_command),
+    ('news', news_command),
+    ('story', story_command),
+    ('brainstorm', brainstorm_command),
+    ('poll', poll_command),
+    ('discuss', discuss_command),
+    ('fact', fact_command),
+    
+    # RAG Document Commands
+    ('documents', documents_command),
+    ('docs', documents_command),  # Alias
+    ('sync_docs', sync_docs_command),
+    ('rag_stats', rag_stats_command),
+    
+    # Admin Testing & Control Commands
+    ('test_automation', test_automation_command),
+    ('force_post', force_post_command),
+    ('activate_group', activate_group_command),
+    ('diagnose', diagnose_command),
+)
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently across chats but one at a time per chat"""
+    
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._chat_locks = {}  # chat_id -> [lock, updates using it]
+    
+    async def do_process_update(self, update, coroutine):
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await coroutine
+            return
+        
+        entry = self._chat_locks.get(chat.id)
+        if entry is None:
+            entry = self._chat_locks[chat.id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        
+        try:
+            async with entry[0]:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[chat.id]
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
+
+def _build_app():
+    """Create the Telegram application"""
+    # Bot API calls are small text requests, so a hung call fails fast
+    # instead of holding a handler for most of a minute. HTTP/2 multiplexes
+    # concurrent calls over kept-alive connections to api.telegram.org
+    request = HTTPXRequest(
+        connection_pool_size=64,
+        connect_timeout=5,
+        read_timeout=5,
+        write_timeout=5,
+        pool_timeout=1.0,
+        http_version="2"
+    )
+    
+    # Other chats' updates are handled while one handler is waiting on its
+    # reply delay or a search; each chat's own updates stay in order
+    return Application.builder() \
+        .token(TELEGRAM_BOT_TOKEN) \
+        .request(request) \
+        .concurrent_updates(ChatOrderedUpdateProcessor(256)) \
+        .post_init(post_init) \
+        .post_shutdown(post_shutdown) \
+        .build()
+
 def main():
     """Run Eva with webhook"""
     logger.info("=" * 60)
     logger.info("🇳🇦 EVA GEISES - FULL GROUP MANAGEMENT BOT")
     logger.info("=" * 60)
-    logger.info(f"✅ Topics: {len(eva.kb.get_all_topics())}")
-    logger.info(f"✅ Categories: {len(eva.kb.get_categories())}")
-    logger.info(f"✅ Properties: {len(eva.get_property_posts())}")
+    logger.info(
+        "✅ Topics: %d | Categories: %d | Properties: %d",
+        len(eva.kb.get_all_topics()),
+        len(eva.kb.get_categories()),
+        len(eva.get_property_posts())
+    )
     logger.info("=" * 60)
     
-    # Note: RAG sync will happen on first /sync_docs command or auto-sync
-    # We don't sync on startup to avoid event loop conflicts
-    logger.info("📚 RAG system ready - use /sync_docs to load documents")
+    # RAG sync runs in post_init, once the application's event loop is up
+    logger.info("📚 RAG documents will sync on startup - /sync_docs to refresh")
     logger.info("=" * 60)
     
     # Extract base URL from webhook URL for self-ping
@@ -1526,55 +1957,23 @@ def main():
         logger.info("🏥 Basic health server started on port 8080")
         logger.warning("⚠️ Update health_server.py for self-ping feature")
     
-    # Build application
+    # Faster event loop where available; must be installed before the
+    # application creates its loop
     try:
-        from telegram.ext import JobQueue
-        app = Application.builder() \
-            .token(TELEGRAM_BOT_TOKEN) \
-            .connect_timeout(15) \
-            .read_timeout(10) \
-            .write_timeout(10) \
-            .build()
-        has_job_queue = True
+        import uvloop
+        uvloop.install()
+        logger.info("⚡ uvloop enabled")
     except ImportError:
+        pass
+    
+    # Build application
+    if not HAS_JOB_QUEUE:
         logger.warning("⚠️ JobQueue not available")
-        app = Application.builder() \
-            .token(TELEGRAM_BOT_TOKEN) \
-            .connect_timeout(15) \
-            .read_timeout(10) \
-            .write_timeout(10) \
-            .build()
-        has_job_queue = False
+    app = _build_app()
     
     # Add handlers
-    app.add_handler(CommandHandler('start', start))
-    app.add_handler(CommandHandler('menu', menu_command))
-    app.add_handler(CommandHandler('properties', properties_command))
-    app.add_handler(CommandHandler('topics', topics_command))
-    app.add_handler(CommandHandler('stats', stats_command))
-    app.add_handler(CommandHandler('help', help_command))
-    app.add_handler(CommandHandler('add', add_command))
-    
-    # Advanced AI Commands
-    app.add_handler(CommandHandler('weather', weather_command))
-    app.add_handler(CommandHandler('news', news_command))
-    app.add_handler(CommandHandler('story', story_command))
-    app.add_handler(CommandHandler('brainstorm', brainstorm_command))
-    app.add_handler(CommandHandler('poll', poll_command))
-    app.add_handler(CommandHandler('discuss', discuss_command))
-    app.add_handler(CommandHandler('fact', fact_command))
-    
-    # RAG Document Commands
-    app.add_handler(CommandHandler('documents', documents_command))
-    app.add_handler(CommandHandler('docs', documents_command))  # Alias
-    app.add_handler(CommandHandler('sync_docs', sync_docs_command))
-    app.add_handler(CommandHandler('rag_stats', rag_stats_command))
-    
-    # Admin Testing & Control Commands
-    app.add_handler(CommandHandler('test_automation', test_automation_command))
-    app.add_handler(CommandHandler('force_post', force_post_command))
-    app.add_handler(CommandHandler('activate_group', activate_group_command))
-    app.add_handler(CommandHandler('diagnose', diagnose_command))
+    for name, callback in _COMMANDS:
+        app.add_handler(CommandHandler(name, callback))
     
     app.add_handler(CallbackQueryHandler(button_handler))
     app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, handle_new_members))
@@ -1582,23 +1981,14 @@ def main():
     app.add_handler(MessageHandler(filters.TEXT & filters.ChatType.PRIVATE, handle_private_message))
     
     # Schedule jobs
-    if has_job_queue and app.job_queue:
+    if HAS_JOB_QUEUE and app.job_queue:
         # Property posts 3x daily: 10 AM, 2 PM, 6 PM
-        app.job_queue.run_daily(
-            post_multiple_properties,
-            time=datetime.strptime("10:00", "%H:%M").time(),
-            name="property_post_10am"
-        )
-        app.job_queue.run_daily(
-            post_multiple_properties,
-            time=datetime.strptime("14:00", "%H:%M").time(),
-            name="property_post_2pm"
-        )
-        app.job_queue.run_daily(
-            post_multiple_properties,
-            time=datetime.strptime("18:00", "%H:%M").time(),
-            name="property_post_6pm"
-        )
+        for post_time in _PROPERTY_POST_TIMES:
+            app.job_queue.run_daily(
+                post_multiple_properties,
+                time=post_time,
+                name=f"property_post_{post_time.hour}"
+            )
         
         # Periodic greetings every 2 hours
         app.job_queue.run_repeating(
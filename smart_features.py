@@ -4,36 +4,51 @@ Add this to your existing bot WITHOUT changing any other code
 """
 
 import random
+import time
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+
+class TokenBucket:
+    """Per-key token buckets, bounded so cold keys get evicted"""
+    
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate  # Tokens refilled per second
+        self.burst = burst  # Bucket capacity
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # key -> (tokens, last_ts)
+    
+    def allow(self, key):
+        """Take one token for key - Returns False when the bucket is empty"""
+        now = time.monotonic()
+        tokens, last_ts = self.buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last_ts) * self.rate)
+        
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        
+        # Re-insert as most recent; drop the least recently seen keys
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        
+        return allowed
 
 class SmartFeatures:
     """Additional smart features for Eva - ADD to existing bot"""
     
     def __init__(self):
-        self.user_message_count = defaultdict(list)  # Track messages per user
+        self.message_bucket = TokenBucket(rate=5 / 30, burst=5)  # ~5 messages per 30 seconds per user
         self.user_warnings = defaultdict(int)  # Track warnings
         self.last_greeting_time = {}  # Track when we last greeted
         self.chat_activity = defaultdict(int)  # Track chat activity
         
     def check_spam(self, user_id, chat_id):
         """Detect if user is spamming - Returns (is_spam, warning_level)"""
-        now = datetime.now()
-        chat_key = f"{chat_id}_{user_id}"
-        
-        # Clean old messages (older than 30 seconds)
-        self.user_message_count[chat_key] = [
-            msg_time for msg_time in self.user_message_count[chat_key]
-            if now - msg_time < timedelta(seconds=30)
-        ]
-        
-        # Add current message
-        self.user_message_count[chat_key].append(now)
-        
-        # Check spam: more than 5 messages in 30 seconds
-        message_count = len(self.user_message_count[chat_key])
+        chat_key = (chat_id, user_id)
         
-        if message_count > 5:
+        # Check spam: bucket holds 5 messages and refills over 30 seconds
+        if not self.message_bucket.allow(chat_key):
             self.user_warnings[chat_key] += 1
             return True, self.user_warnings[chat_key]
         